@@ -0,0 +1,97 @@
+""" Profile import time of the app's entry points with `python -X importtime`
+
+    python benchmarks/importtime.py --output benchmarks/importtime.md
+
+Each entry point is imported in a fresh interpreter `--repeat` times,
+the fastest run is reported along with the top-level imports
+that dominate it. """
+import argparse
+import os
+from pathlib import Path
+import subprocess
+import sys
+from typing import List, Tuple
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "catsketball"
+
+# What each part of the app imports before it can render, the app
+# itself starts from streamlit alone. Keep in sync with app.py
+ENTRY_POINTS = {
+    "streamlit alone": "import streamlit, instrumentation",
+    "player tab": "import draft, projection_sources, stat_analysis, styling",
+    "league tab (after cookies)": (
+        "import pandas, constants, espn_cache, espn_fetch, espn_stats, memo, "
+        "lineup, simulation, styling, valuation"
+    ),
+    "cli": "import cli",
+}
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """ Total import time (ms) and the cumulative time (ms)
+    of every top-level import, slowest first """
+    total = 0.0
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us) / 1e3
+        # Nested imports are indented by two spaces per level
+        if not name[1:].startswith(" "):
+            top_level.append((name.strip(), int(cumulative_us) / 1e3))
+    return total, sorted(top_level, key=lambda x: x[1], reverse=True)
+
+
+def profile(statement: str, repeat: int) -> Tuple[float, List[Tuple[str, float]]]:
+    env = {**os.environ, "PYTHONPATH": str(PACKAGE_DIR)}
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            capture_output=True, text=True, env=env, cwd=PACKAGE_DIR,
+            check=True
+        )
+        runs.append(parse_importtime(result.stderr))
+    return min(runs, key=lambda run: run[0])
+
+
+def report(repeat: int, top: int) -> str:
+    lines = [
+        "# Import time",
+        "",
+        f"`python benchmarks/importtime.py`, fastest of {repeat} runs, "
+        f"Python {sys.version.split()[0]}",
+        "",
+    ]
+    for name, statement in ENTRY_POINTS.items():
+        total, top_level = profile(statement, repeat)
+        lines += [
+            f"## {name}: {total:.0f} ms",
+            "",
+            f"`{statement}`",
+            "",
+            "| top-level import | cumulative ms |",
+            "| --- | ---: |",
+            *[f"| {module} | {ms:.1f} |" for module, ms in top_level[:top]],
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    text = report(args.repeat, args.top)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
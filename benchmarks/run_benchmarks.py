@@ -0,0 +1,203 @@
+""" Time the espn_stats / stat_analysis / styling hot paths on synthetic data
+
+    python benchmarks/run_benchmarks.py --preset small medium --json results.json
+
+Reports best and median wall time over `--repeat` runs and the peak
+memory allocated (tracemalloc) during one extra run. Runs offline. """
+import argparse
+import datetime
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+import warnings
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+import synthetic
+
+import constants
+import draft
+import espn_stats
+import lineup
+import pro_schedule
+import simulation
+import stat_analysis
+import styling
+import valuation
+
+# Benchmarks run outside `streamlit run`, silence bare-mode warnings
+for name in list(logging.root.manager.loggerDict):
+    if name.startswith("streamlit"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+warnings.simplefilter("ignore")
+
+PRESETS = {
+    "small": dict(n_teams=8, roster_size=13, pool_size=400),
+    "medium": dict(n_teams=14, roster_size=15, pool_size=1000),
+    "large": dict(n_teams=20, roster_size=20, pool_size=2000),
+}
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # warm up caches and imports
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "best_ms": min(times) * 1e3,
+        "median_ms": statistics.median(times) * 1e3,
+        "peak_mib": peak / 2 ** 20,
+    }
+
+
+def build_cases(n_teams: int, roster_size: int, pool_size: int) -> List[Tuple[str, Callable]]:
+    league = synthetic.make_league(n_teams, roster_size, pool_size)
+    pool = synthetic.pool_players(league)
+    schedule_index = constants.get_schedule_index()
+    season_start = schedule_index.dates[0].astype('datetime64[D]').item()
+    season_start = datetime.datetime.combine(season_start, datetime.time())
+    season_end = season_start + datetime.timedelta(days=182)
+    weeks = [
+        (season_start + datetime.timedelta(weeks=i),
+         season_start + datetime.timedelta(weeks=i + 1))
+        for i in range(26)
+    ]
+    week_start, week_end = weeks[3]
+
+    player_names = [player.name for player in pool]
+    draft_rosters = {
+        team.team_name: player_names[i::n_teams][:roster_size]
+        for i, team in enumerate(league.teams)
+    }
+    league_summary = espn_stats.summarize_league_per_team(league)
+    # What pull_all_players caches inside the app
+    pool_stats = espn_stats.get_pool_player_stats(league)
+    player_pool = espn_stats.PlayerPool.from_frame(pool_stats)
+    simulation_inputs = simulation.build_simulation_inputs(league, weeks)
+
+    game_logs = synthetic.make_game_logs(pool_size)
+
+    projections = synthetic.make_projections(pool_size)
+    store = stat_analysis.ProjectionsStore(projections)
+    rng = np.random.default_rng(0)
+
+    def draft_pick():
+        idx = int(rng.integers(len(store)))
+        team = int(store.drafted_by[idx] == 0) * int(rng.integers(1, n_teams + 1))
+        store.apply_edits({idx: {"drafted_by": team}})
+
+    recommender = draft.DraftRecommender(
+        stat_analysis.ProjectionsStore(projections), team=1
+    )
+
+    def recommend_pick():
+        best = recommender.best_available(top=1)
+        if len(best) == 0:
+            recommender.store.apply_edits({
+                idx: {"drafted_by": 0} for idx in range(len(recommender.store))
+            })
+            return
+        recommender.pick(int(best[0]), int(rng.integers(1, n_teams + 1)))
+
+    return [
+        ("summarize_league_per_team", lambda: espn_stats.summarize_league_per_team(
+            league, include_dtdq=True
+        )),
+        ("get_weekly_stats_team (every team, one week)", lambda: [
+            espn_stats.get_weekly_stats_team(team, week_start, week_end)
+            for team in league.teams
+        ]),
+        ("get_weekly_stats_league_lineups (every team, one week)", lambda: (
+            lineup.get_weekly_stats_league_lineups(league, week_start, week_end)
+        )),
+        ("get_weekly_stats_team (one team, full season)", lambda: (
+            espn_stats.get_weekly_stats_team(league.teams[0], season_start, season_end)
+        )),
+        ("get_weekly_stats_league_ranges (every team, every week)", lambda: (
+            espn_stats.get_weekly_stats_league_ranges(league, weeks)
+        )),
+        ("simulate_matchups (every team, every week, 1000 sims)", lambda: (
+            simulation.simulate_matchups(simulation_inputs, n_sims=1000, seed=0)
+        )),
+        ("search_trades (every 1-for-1 and 2-for-2)", lambda: (
+            espn_stats.search_trades(league, league.teams[0], league.teams[1])
+        )),
+        ("pro_schedule.load_schedule().to_index()", lambda: (
+            pro_schedule.load_schedule().to_index()
+        )),
+        ("pull_all_players stat reduction", lambda: espn_stats.get_avg_stats_roster(
+            pool, include_dtdq=True, include_o=True
+        )),
+        ("pull_all_players stat reduction (PlayerStatCache hit)", lambda: (
+            espn_stats.get_avg_stats_roster(
+                pool, include_dtdq=True, include_o=True, version="benchmark"
+            )
+        )),
+        ("summarize_league_draft", lambda: espn_stats.summarize_league_draft(
+            league, draft_rosters, all_player_stats=pool_stats
+        )),
+        ("GameLogs last 14 days + ewm + date range (whole pool)", lambda: (
+            game_logs.last_days(14), game_logs.ewm(10.0),
+            game_logs.window(season_start + datetime.timedelta(days=30), season_end)
+        )),
+        ("value_pool (whole pool, every week)", lambda: (
+            valuation.value_pool(player_pool, weeks, schedule=schedule_index)
+        )),
+        ("update_zscores (one draft pick)", draft_pick),
+        ("DraftRecommender (recommend and make one pick)", recommend_pick),
+        ("styling.style_categories(...).to_html()", lambda: (
+            styling.style_categories(league_summary).to_html()
+        )),
+        ("styling.categories_html (unchanged table)", lambda: (
+            styling.categories_html(league_summary)
+        )),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--preset", nargs="+", default=["small"], choices=sorted(PRESETS)
+    )
+    parser.add_argument("--teams", type=int, help="override number of teams")
+    parser.add_argument("--roster", type=int, help="override roster size")
+    parser.add_argument("--pool", type=int, help="override player pool size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for preset in args.preset:
+        sizes = dict(PRESETS[preset])
+        for key, override in [
+            ("n_teams", args.teams), ("roster_size", args.roster),
+            ("pool_size", args.pool)
+        ]:
+            if override is not None:
+                sizes[key] = override
+        print(f"\n{preset}: {sizes}")
+        print(f"{'case':<58}{'best ms':>10}{'median ms':>12}{'peak MiB':>10}")
+        for name, fn in build_cases(**sizes):
+            result = measure(fn, args.repeat)
+            print(
+                f"{name:<58}{result['best_ms']:>10.2f}"
+                f"{result['median_ms']:>12.2f}{result['peak_mib']:>10.2f}"
+            )
+            results.append({"preset": preset, **sizes, "case": name, **result})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+""" Synthetic espn_api leagues and projection tables for benchmarks
+
+Players are built from ESPN-shaped payloads, so the benchmarks exercise
+the same espn_api parsing and attribute layout as a real league """
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "catsketball"))
+
+from espn_api.basketball import League, Player, Team
+from espn_api.basketball.constant import POSITION_MAP, STATS_MAP
+
+import gamelog
+import projection_sources
+
+YEAR = 2025
+STAT_IDS = {name: stat_id for stat_id, name in STATS_MAP.items()}
+# Per-game means used to draw synthetic stat lines
+STAT_MEANS = {
+    'PTS': 14.0, 'BLK': 0.6, 'STL': 0.9, 'REB': 5.0, 'AST': 3.2,
+    'TO': 1.6, 'FGA': 11.0, 'FTA': 3.0, '3PM': 1.4,
+}
+INJURY_STATUSES = ['ACTIVE', 'DAY_TO_DAY', 'QUESTIONABLE', 'OUT']
+SLOT_IDS = [POSITION_MAP[slot] for slot in ['PG', 'SG', 'SF', 'PF', 'C', 'G', 'F', 'UT', 'BE', 'IR']]
+
+
+def _stat_line(rng: np.random.Generator, scale: float) -> dict:
+    line = {
+        name: float(rng.gamma(4.0, mean * scale / 4.0))
+        for name, mean in STAT_MEANS.items()
+    }
+    line['FGM'] = line['FGA'] * float(rng.uniform(0.38, 0.6))
+    line['FTM'] = line['FTA'] * float(rng.uniform(0.6, 0.92))
+    return {STAT_IDS[name]: value for name, value in line.items()}
+
+
+def player_payload(rng: np.random.Generator, player_id: int, lineup_slot_id: int) -> dict:
+    """ Roster entry shaped like ESPN's mRoster / kona_player_info """
+    scale = float(rng.uniform(0.3, 2.0))
+    splits = []
+    for prefix in ['00', '10', '03']:
+        if rng.random() < 0.1:
+            continue
+        avg = _stat_line(rng, scale)
+        splits.append({
+            'id': f'{prefix}{YEAR}',
+            'seasonId': YEAR,
+            'scoringPeriodId': 0,
+            'appliedTotal': 0.0,
+            'appliedAverage': 0.0,
+            'averageStats': avg,
+            'stats': {k: v * 60 for k, v in avg.items()},
+        })
+    default_position = int(rng.integers(1, 6))
+    return {
+        'playerPoolEntry': {
+            'player': {
+                'id': player_id,
+                'fullName': f'Player {player_id}',
+                'defaultPositionId': default_position,
+                'eligibleSlots': [default_position - 1, 5 + (default_position > 2), 11, 12, 13],
+                'proTeamId': int(rng.integers(1, 31)),
+                'injuryStatus': str(rng.choice(INJURY_STATUSES, p=[0.8, 0.06, 0.06, 0.08])),
+                'injured': False,
+                'stats': splits,
+            },
+            'acquisitionType': 'DRAFT',
+        },
+        'lineupSlotId': lineup_slot_id,
+    }
+
+
+def make_players(rng: np.random.Generator, n: int, start_id: int = 0) -> List[dict]:
+    return [
+        player_payload(rng, start_id + i, int(rng.choice(SLOT_IDS)))
+        for i in range(n)
+    ]
+
+
+def team_payload(team_id: int) -> dict:
+    return {
+        'id': team_id,
+        'abbrev': f'T{team_id}',
+        'name': f'Team {team_id}',
+        'divisionId': 0,
+        'record': {'overall': {
+            'wins': 0, 'losses': 0, 'ties': 0,
+            'pointsFor': 0, 'pointsAgainst': 0,
+        }},
+        'playoffSeed': team_id,
+        'rankCalculatedFinal': 0,
+    }
+
+
+class _StubRequests:
+    """ Serves the kona_player_info player pool without ESPN """
+    def __init__(self, player_pool: List[dict]):
+        self.player_pool = player_pool
+
+    def league_get(self, params: Optional[dict] = None, headers: Optional[dict] = None, extend: str = ''):
+        return {'players': self.player_pool}
+
+
+def make_league(
+    n_teams: int = 12,
+    roster_size: int = 13,
+    pool_size: int = 400,
+    seed: int = 0
+) -> League:
+    """ League of `n_teams` rosters plus a `pool_size` player pool
+    for pull_all_players, no network access needed """
+    rng = np.random.default_rng(seed)
+    league = League(league_id=0, year=YEAR, fetch_league=False)
+    league.current_week = 1
+    league.teams = [
+        Team(
+            team_payload(i + 1),
+            roster={'entries': make_players(rng, roster_size, start_id=i * roster_size)},
+            schedule=[],
+            year=YEAR
+        )
+        for i in range(n_teams)
+    ]
+    league.espn_request = _StubRequests(
+        make_players(rng, pool_size, start_id=n_teams * roster_size)
+    )
+    return league
+
+
+def pool_players(league: League) -> List[Player]:
+    return [Player(payload, YEAR) for payload in league.espn_request.player_pool]
+
+
+def make_projections(n_players: int = 400, seed: int = 0) -> pa.Table:
+    """ Normalized projection table shaped like projection_sources output """
+    rng = np.random.default_rng(seed)
+    fga = rng.gamma(4.0, 3.0, n_players)
+    fta = rng.gamma(4.0, 0.8, n_players)
+    df = pd.DataFrame({
+        'PLAYER': [f'Player {i}' for i in range(n_players)],
+        'GP': rng.integers(40, 82, n_players),
+        'MPG': rng.uniform(12, 38, n_players),
+        'FG%': rng.uniform(38, 62, n_players),
+        'FT%': rng.uniform(55, 92, n_players),
+        '3PM': rng.gamma(2.0, 0.8, n_players),
+        'PTS': rng.gamma(4.0, 3.5, n_players),
+        'TREB': rng.gamma(3.0, 1.8, n_players),
+        'AST': rng.gamma(2.0, 1.6, n_players),
+        'STL': rng.gamma(3.0, 0.3, n_players),
+        'BLK': rng.gamma(2.0, 0.3, n_players),
+        'TO': rng.gamma(3.0, 0.5, n_players),
+        'FGA': fga,
+        'FTA': fta,
+    })
+    return projection_sources._to_arrow(projection_sources.normalize_projections(df))
+
+
+def make_game_logs(
+    n_players: int = 400,
+    n_days: int = 120,
+    seed: int = 0
+) -> gamelog.GameLogs:
+    """ A season of box scores, each player playing about 4 days in 5 """
+    rng = np.random.default_rng(seed)
+    player_rows, day_offsets = np.nonzero(rng.random((n_players, n_days)) < 0.8)
+    means = np.array([STAT_MEANS.get(stat, 0.0) for stat in gamelog.LOG_STATS])
+    stats = rng.poisson(means, size=(len(player_rows), len(means))).astype(np.float64)
+    stats[:, gamelog.LOG_STATS.index('FGM')] = rng.binomial(
+        stats[:, gamelog.LOG_STATS.index('FGA')].astype(int), 0.47
+    )
+    stats[:, gamelog.LOG_STATS.index('FTM')] = rng.binomial(
+        stats[:, gamelog.LOG_STATS.index('FTA')].astype(int), 0.78
+    )
+    stats[:, gamelog.LOG_STATS.index('MIN')] = rng.uniform(10, 38, len(player_rows))
+    return gamelog.GameLogs(
+        player_ids=np.arange(n_players),
+        names=[f'Player {i}' for i in range(n_players)],
+        pro_teams=['BOS'] * n_players,
+        player_rows=player_rows,
+        dates=np.datetime64('2024-10-22') + day_offsets.astype('timedelta64[D]'),
+        stats=stats
+    )
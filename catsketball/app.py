@@ -1,17 +1,48 @@
-import copy
 import datetime
-from espn_api.basketball import League
-import pandas as pd
-from scipy.stats import zscore
 import streamlit as st
 st.set_page_config(
     page_title='Catsketball', page_icon=':basketball:', layout="wide"
 )
+import instrumentation
+# Set CATSKETBALL_INSTRUMENT=1 for timings and a debug panel
+rerun = instrumentation.start_rerun()
 
-import constants, espn_stats, stat_analysis, styling
+# Modules are imported by the tab that uses them, so the page
+# starts rendering before pandas and the ESPN client are loaded
 
 YEAR = 2025
 
+
+@st.cache_resource
+def get_payload_cache():
+    """ ESPN responses shared across sessions and restarts """
+    import espn_cache
+    return espn_cache.PayloadCache()
+
+
+@st.cache_resource
+def get_fetch_client():
+    """ Pooled ESPN connections shared across sessions """
+    import espn_fetch
+    return espn_fetch.FetchClient()
+
+
+def get_memo_cache():
+    """ This session's memoized section results, see memo.py """
+    if "memo_cache" not in st.session_state:
+        import memo
+        st.session_state.memo_cache = memo.MemoCache()
+    return st.session_state.memo_cache
+
+
+def section_expander(label: str):
+    """ Expander that reruns when toggled, so a section
+    only computes its tables while it is open """
+    return st.expander(
+        label, key=f"{label.lower().replace(' ', '_')}_open", on_change="rerun"
+    )
+
+
 st.title(":basketball:")
 league_tab, player_tab = st.tabs(["League-based comparisons", "Static player comparisons"])
 # This first form submits ESPN league settings
@@ -41,123 +72,301 @@ with league_tab:
         (st.session_state.get("espn_s2", '') != '') and 
         (st.session_state.get("swid", '') != '')
     ):
-        league = League(
+        import pandas as pd
+        import constants, espn_stats, lineup, simulation, styling, valuation
+
+        league = espn_stats.build_league(
             league_id=st.session_state['league_id'],
             espn_s2=st.session_state['espn_s2'],
             swid=st.session_state['swid'],
-            year=YEAR
+            year=YEAR,
+            cache=get_payload_cache(),
+            client=get_fetch_client()
         )
-        team_mapping = espn_stats.build_team_mapping(league)
-
         include_dtdq = st.checkbox(
             "Include day-to-day/questionable players " +
             "(IR players are always ignored)"
         )
         include_o = st.checkbox("Include out players")
 
-        with st.expander("League summary"):
-            st.text("Sum of each player's per-game average")
-            league_summary = espn_stats.summarize_league_per_team(
-                league, include_dtdq=include_dtdq, include_o=include_o
-            )
-            st.markdown(
-                styling.style_categories(league_summary).to_html(),
-                unsafe_allow_html=True
-            )
-            st.caption("Ignoring players on IR")
+        # Sections are fragments, so their own widgets only rerun them,
+        # and their tables are memoized on exactly the inputs they read
+        version = espn_stats.league_version(league)
+        flags = (include_dtdq, include_o)
 
+        @st.fragment
+        def league_summary_section(league, version, include_dtdq, include_o):
+            expander = section_expander("League summary")
+            with expander, instrumentation.span("app.league_summary"):
+                st.text("Sum of each player's per-game average")
+                if expander.open:
+                    st.markdown(
+                        get_memo_cache().get(
+                            "league_summary", (version, include_dtdq, include_o),
+                            lambda: styling.categories_html(
+                                espn_stats.summarize_league_per_team(
+                                    league, include_dtdq=include_dtdq,
+                                    include_o=include_o
+                                )
+                            )
+                        ),
+                        unsafe_allow_html=True
+                    )
+                st.caption("Ignoring players on IR")
 
-        with st.expander("Weekly comparisons"):
-            all_teams = st.multiselect(
-                "Choose teams: ",
-                options=[a.team_name for a in league.teams]
-            )
-            date_selector = st.date_input(
-                "Select date range, including start date, up to (and not including) end date: ",
-                value=(datetime.date.today(), datetime.date.today())
-            )
 
-            if len(date_selector) == 2:
-                start_date, end_date = date_selector
-            else:
-                st.error("Choose two valid dates")
-                st.stop()
-            start_date = datetime.datetime.combine(
-                start_date, datetime.datetime.min.time()
-            )
-            end_date = datetime.datetime.combine(
-                end_date, datetime.datetime.min.time()
-            )
-            if (len(all_teams) > 0) and (start_date != end_date):
-                all_team_stats = []
-                for team in all_teams:
-                    team_i = espn_stats.get_weekly_stats_team(
-                        team_mapping[team], start_date, end_date,
-                        include_dtdq=include_dtdq,
-                        include_o=include_o
-                    )
-                    team_i['Name'] = team
-                    all_team_stats.append(team_i)
-                h2h_comparison = (
-                    pd.DataFrame(all_team_stats)
-                    .set_index("Name")
+        @st.fragment
+        def weekly_comparisons_section(league, version, include_dtdq, include_o):
+            expander = section_expander("Weekly comparisons")
+            with expander, instrumentation.span("app.weekly_comparisons"):
+                team_mapping = espn_stats.build_team_mapping(league)
+                all_teams = st.multiselect(
+                    "Choose teams: ",
+                    options=[a.team_name for a in league.teams]
                 )
-                st.markdown(
-                    styling.style_categories(h2h_comparison).to_html(),
-                    unsafe_allow_html=True
+                date_selector = st.date_input(
+                    "Select date range, including start date, up to (and not including) end date: ",
+                    value=(datetime.date.today(), datetime.date.today())
                 )
-            st.caption("Ignoring players on IR")
+
+                if len(date_selector) == 2:
+                    start_date, end_date = date_selector
+                else:
+                    st.error("Choose two valid dates")
+                    return
+                start_date = datetime.datetime.combine(
+                    start_date, datetime.datetime.min.time()
+                )
+                end_date = datetime.datetime.combine(
+                    end_date, datetime.datetime.min.time()
+                )
+                use_lineups = st.checkbox(
+                    "Only count games of each day's best starting lineup"
+                )
+                teams = [team_mapping[team] for team in all_teams]
+                key = (
+                    version, tuple(team.team_id for team in teams),
+                    start_date, end_date, include_dtdq, include_o
+                )
+                if expander.open and (len(all_teams) > 0) and (start_date != end_date):
+                    st.markdown(
+                        get_memo_cache().get(
+                            "weekly_comparisons", (*key, use_lineups),
+                            lambda: styling.categories_html((
+                                lineup.get_weekly_stats_league_lineups if use_lineups 
+                                else espn_stats.get_weekly_stats_league
+                            )(
+                                league, start_date, end_date, teams=teams,
+                                include_dtdq=include_dtdq, include_o=include_o
+                            ))
+                        ),
+                        unsafe_allow_html=True
+                    )
+                    if (len(all_teams) > 1) and st.checkbox("Simulate win probabilities"):
+                        matchup_simulation = get_memo_cache().get(
+                            "matchup_simulation", key,
+                            lambda: simulation.simulate_league(
+                                league, [(start_date, end_date)], teams=teams,
+                                n_sims=2000,
+                                include_dtdq=include_dtdq,
+                                include_o=include_o
+                            )
+                        )
+                        st.text("Probability that each row team beats each column team")
+                        st.dataframe(
+                            matchup_simulation.win_prob_frame().style.format("{:.0%}")
+                        )
+                        st.text(f"Category win probabilities, {all_teams[0]} vs {all_teams[1]}")
+                        st.dataframe(
+                            matchup_simulation.category_win_prob_frame(
+                                all_teams[0], all_teams[1]
+                            ).reset_index(drop=True).style.format("{:.0%}")
+                        )
+                st.caption("Ignoring players on IR")
 
 
-        with st.expander("Team builder"):
-            all_players = espn_stats.pull_all_players(league)
-            player_names = list(all_players.index)
+        @st.fragment
+        def rest_of_season_section(league, version):
+            expander = section_expander("Rest-of-season values")
+            with expander, instrumentation.span("app.rest_of_season_values"):
+                value_start_date = st.date_input(
+                    "Count games from: ", value=datetime.date.today(),
+                    key="value_start_date"
+                )
+                if expander.open:
+                    pool_valuation = get_memo_cache().get(
+                        "rest_of_season_values", (version, value_start_date),
+                        lambda: valuation.value_rest_of_season(
+                            league,
+                            start_date=datetime.datetime.combine(
+                                value_start_date, datetime.datetime.min.time()
+                            ),
+                            all_player_stats=espn_stats.pull_all_players(league)
+                        )
+                    )
+                    value_window = st.selectbox(
+                        "Value over: ",
+                        options=[None, *range(len(pool_valuation.date_ranges))],
+                        format_func=lambda week: (
+                            "Rest of season" if week is None else
+                            f"Week of {pool_valuation.date_ranges[week][0]:%Y-%m-%d}"
+                        )
+                    )
+                    player_values = pool_valuation.frame(
+                        week=value_window,
+                        mask=(
+                            ~valuation.get_rostered_mask(league, pool_valuation.pool)
+                            if st.checkbox("Free agents only") else None
+                        )
+                    )
+                    st.dataframe(player_values.drop(columns=["playerId"]).round(2))
+                st.caption(
+                    "Value is the sum of category z-scores of each player's totals " +
+                    "over their NBA team's remaining games"
+                )
 
-            n_cols = 3
-            all_columns = st.columns(n_cols)
 
-            team_rosters = {} # Map team name to list of player names
-            for i, team in enumerate(league.teams):
-                col_selector = (i % 3)
-                team_rosters[team.team_name] = (
-                    all_columns[col_selector].multiselect(
-                        f"{team.team_name}", options=player_names
+        @st.fragment
+        def trade_analyzer_section(league, version, include_dtdq, include_o):
+            expander = section_expander("Trade analyzer")
+            with expander, instrumentation.span("app.trade_analyzer"):
+                team_mapping = espn_stats.build_team_mapping(league)
+                trade_columns = st.columns(2)
+                trade_teams = [
+                    team_mapping[trade_columns[side].selectbox(
+                        f"Team {side + 1}: ",
+                        options=[a.team_name for a in league.teams],
+                        index=min(side, len(league.teams) - 1),
+                        key=f"trade_team_{side}"
+                    )]
+                    for side in (0, 1)
+                ]
+                trade_players = [
+                    trade_columns[side].multiselect(
+                        "Sends: ",
+                        options=[player.playerId for player in trade_teams[side].roster],
+                        format_func={
+                            player.playerId: player.name
+                            for player in trade_teams[side].roster
+                        }.get,
+                        key=f"trade_players_{side}"
                     )
+                    for side in (0, 1)
+                ]
+                key = (
+                    version, *(team.team_id for team in trade_teams),
+                    include_dtdq, include_o
                 )
-            draft_summary = espn_stats.summarize_league_draft(
-                league, team_rosters, include_dtdq=include_dtdq,
-                include_o=include_o
-            )
+                if trade_teams[0] is trade_teams[1]:
+                    st.error("Choose two different teams")
+                elif (len(trade_players[0]) > 0) or (len(trade_players[1]) > 0):
+                    if expander.open:
+                        st.dataframe(get_memo_cache().get(
+                            "trade_analysis",
+                            (*key, *(tuple(players) for players in trade_players)),
+                            lambda: trade_frame(espn_stats.evaluate_trades(
+                                league, *trade_teams, [tuple(trade_players)],
+                                include_dtdq=include_dtdq, include_o=include_o
+                            ))
+                        ))
+                elif st.checkbox("Search every 1-for-1 and 2-for-2 trade"):
+                    if expander.open:
+                        st.dataframe(get_memo_cache().get(
+                            "trade_search", key,
+                            lambda: espn_stats.search_trades(
+                                league, *trade_teams,
+                                include_dtdq=include_dtdq, include_o=include_o
+                            ).frame(top=25)
+                        ))
+                st.caption("Per-game averages summed over each roster, ignoring players on IR")
 
-            st.markdown(
-                styling.style_categories(draft_summary).to_html(),
-                unsafe_allow_html=True
+
+        def trade_frame(trade_analysis) -> pd.DataFrame:
+            """ Each side's categories before and after the first trade"""
+            return pd.concat(
+                {
+                    trade_analysis.team_names[side]: pd.DataFrame({
+                        "Before": trade_analysis.categories_before[side],
+                        "Change": trade_analysis.deltas[0, side],
+                        "Rank before": trade_analysis.ranks_before[side],
+                        "Rank after": trade_analysis.ranks_after[0, side],
+                    }, index=constants.CATEGORIES)
+                    for side in (0, 1)
+                },
+                axis=1
             )
 
-with player_tab:
-    if "projections" not in st.session_state:
-        st.session_state.projections = stat_analysis.load_projections()
-    if "projections_modified" not in st.session_state:
-        st.session_state.projections_modified = copy.copy(stat_analysis.load_projections())
-    if "standardizers" not in st.session_state:
-        st.session_state.standardizers = stat_analysis.init_standardizers()
-    if "stdzd_table" not in st.session_state:
-        stat_analysis.fit_standardizers(
-            st.session_state.projections_modified, 
-            st.session_state.standardizers
-        )
-        
-        stdzd_table = stat_analysis.standardize(
-            st.session_state.projections_modified, 
-            st.session_state.standardizers
+
+        @st.fragment
+        def team_builder_section(league, version):
+            expander = section_expander("Team builder")
+            with expander, instrumentation.span("app.team_builder"):
+                all_players = espn_stats.pull_all_players(league)
+                player_pool = espn_stats.PlayerPool.from_frame(all_players)
+
+                # Team totals persist across reruns, each widget change 
+                # only adds or removes the players that changed. They are
+                # rebuilt with the pool whenever the league payloads change
+                team_totals_key = (version, league.current_week)
+                if st.session_state.get("team_totals_key") != team_totals_key:
+                    st.session_state.team_totals = espn_stats.TeamTotals(
+                        player_pool, [team.team_name for team in league.teams]
+                    )
+                    st.session_state.team_totals_key = team_totals_key
+                team_totals = st.session_state.team_totals
+
+                n_cols = 3
+                all_columns = st.columns(n_cols)
+
+                rosters = []
+                for i, team in enumerate(league.teams):
+                    col_selector = (i % 3)
+                    roster = all_columns[col_selector].multiselect(
+                        f"{team.team_name}", 
+                        options=player_pool.player_ids,
+                        format_func=player_pool.name_of
+                    )
+                    team_totals.set_roster(team.team_name, roster)
+                    rosters.append(tuple(roster))
+
+                if expander.open:
+                    st.markdown(
+                        get_memo_cache().get(
+                            "team_builder", (version, *rosters),
+                            lambda: styling.categories_html(team_totals.summary())
+                        ),
+                        unsafe_allow_html=True
+                    )
+
+
+        league_summary_section(league, version, *flags)
+        weekly_comparisons_section(league, version, *flags)
+        rest_of_season_section(league, version)
+        trade_analyzer_section(league, version, *flags)
+        team_builder_section(league, version)
+
+with player_tab, instrumentation.span("app.player_tab"):
+    import draft, projection_sources, stat_analysis, styling
+
+    projection_source = st.selectbox(
+        "Projection source", 
+        options=projection_sources.source_names(),
+        key="projection_source"
+    )
+    if (
+        ("projection_store" not in st.session_state) or
+        (st.session_state.get("projection_store_source") != projection_source)
+    ):
+        st.session_state.projection_store = stat_analysis.ProjectionsStore(
+            stat_analysis.get_projection_base(projection_source)
         )
-        
-        st.session_state.stdzd_table = stdzd_table.to_pandas()
+        st.session_state.projection_store_source = projection_source
+    projection_store = st.session_state.projection_store
         
     st.header("Stat projections")
     st.caption("Modify the `drafted_by` column to update subsequent tables")
     st.data_editor(
-        st.session_state.projections_modified.select([
+        projection_store.to_arrow().select([
             "PLAYER", "RNK", "Value", "drafted_by", "POS", 
             "GP", *stat_analysis.STAT_COLS, "MPG",
         ]),
@@ -169,15 +378,33 @@ with player_tab:
     )
     st.header("Relative stats")
     st.caption("Z-scores compared to players who are still available")
-    if st.session_state.stdzd_table is not None:
+    if projection_store is not None:
         st.dataframe(
-            st.session_state.stdzd_table[lambda df_: df_["drafted_by"] == 0]
-            [["PLAYER", "RNK", "Value", "drafted_by", "POS", 
+            projection_store.to_arrow(standardized=True)
+            .filter(projection_store.available())
+            .select(["PLAYER", "RNK", "Value", "drafted_by", "POS", 
                 "GP", *stat_analysis.STAT_COLS, "MPG",
-            ]]
+            ])
+        )
+        st.header("Draft recommendations")
+        st.caption(
+            "Available players ranked by what they add to one team, " +
+            "FG% and FT% weighted by attempts"
+        )
+        recommend_columns = st.columns(2)
+        recommend_team = recommend_columns[0].number_input(
+            "Recommend for `drafted_by`: ", min_value=1, value=1, step=1
+        )
+        punt = recommend_columns[1].multiselect(
+            "Punt categories: ", options=stat_analysis.STAT_COLS
+        )
+        st.dataframe(
+            draft.DraftRecommender(projection_store, recommend_team, punt=punt)
+            .recommend(top=15).round(2),
+            hide_index=True
         )
         st.header("Team comparison")
-        team_comparison = stat_analysis.compare_teams(st.session_state.stdzd_table)
+        team_comparison = projection_store.compare_teams()
         st.dataframe(
             styling.style_categories(
                 team_comparison.drop(index=[0]), include_tooltips=False,
@@ -209,3 +436,20 @@ with player_tab:
 #            projections[stat_analysis.STAT_COLS] = projections[stat_analysis.STAT_COLS].apply(zscore)
 #            st.dataframe(projections.drop(columns=stat_analysis.POSITIONS), width='stretch')
 
+if rerun is not None:
+    instrumentation.end_rerun(rerun)
+    with st.expander("Debug: timings"):
+        st.text("This rerun, inclusive wall time of nested spans")
+        st.dataframe(instrumentation.span_table(rerun), hide_index=True)
+        st.json(rerun.snapshot()["counters"])
+        st.text(f"Since the server started, last {instrumentation.WINDOW_SIZE} calls per span")
+        st.dataframe(instrumentation.span_table(instrumentation.registry), hide_index=True)
+        download_columns = st.columns(2)
+        download_columns[0].download_button(
+            "Metrics (JSON)", instrumentation.to_json(),
+            file_name="catsketball_metrics.json"
+        )
+        download_columns[1].download_button(
+            "Metrics (Prometheus)", instrumentation.to_prometheus(),
+            file_name="catsketball_metrics.prom"
+        )
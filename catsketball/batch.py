@@ -0,0 +1,219 @@
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+from multiprocessing import shared_memory
+import os
+from pathlib import Path
+import traceback
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import yaml
+
+import constants
+import espn_stats
+from espn_cache import DEFAULT_CACHE_PATH, PayloadCache
+from espn_fetch import FetchClient
+from schedule import ScheduleIndex
+
+
+class LeagueConfig(NamedTuple):
+    """ One ESPN league to summarize """
+    league_id: int
+    year: int
+    espn_s2: Optional[str] = None
+    swid: Optional[str] = None
+    # Team name -> player names or ESPN player ids, for a draft summary
+    draft_rosters: Optional[Dict[str, List[Union[str, int]]]] = None
+
+
+class LeagueResults(NamedTuple):
+    """ Everything computed for one league, or the error that stopped it """
+    league_id: int
+    year: int
+    summary: Optional[pd.DataFrame] = None
+    weekly: Optional[pd.DataFrame] = None
+    draft_summary: Optional[pd.DataFrame] = None
+    error: Optional[str] = None
+
+
+def load_league_configs(path: Path) -> List[LeagueConfig]:
+    """ League configurations from a YAML list of mappings, e.g.
+
+    - league_id: 12345
+      year: 2025
+      espn_s2: ...
+      swid: ... """
+    with open(path, 'r') as f:
+        return [LeagueConfig(**entry) for entry in yaml.safe_load(f)]
+
+
+class SharedArray(NamedTuple):
+    """ Picklable description of a numpy array in shared memory """
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedScheduleIndex(NamedTuple):
+    """ Picklable description of a ScheduleIndex in shared memory """
+    dates: SharedArray
+    cumulative: SharedArray
+    team_ids: List[int]
+
+
+def _share_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, SharedArray]:
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, SharedArray(block.name, array.shape, array.dtype.str)
+
+
+def _attach_array(
+    shared: SharedArray
+) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    block = shared_memory.SharedMemory(name=shared.name)
+    array = np.ndarray(shared.shape, dtype=shared.dtype, buffer=block.buf)
+    array.flags.writeable = False
+    return block, array
+
+
+def share_schedule_index(
+    schedule: ScheduleIndex
+) -> Tuple[List[shared_memory.SharedMemory], SharedScheduleIndex]:
+    """ Copy a ScheduleIndex into shared memory once, for every worker
+    to attach to. Close and unlink the returned blocks when done """
+    dates_block, dates = _share_array(schedule.dates.view(np.int64))
+    cumulative_block, cumulative = _share_array(schedule.cumulative)
+    return (
+        [dates_block, cumulative_block],
+        SharedScheduleIndex(dates, cumulative, list(schedule.team_ids))
+    )
+
+
+def attach_schedule_index(
+    shared: SharedScheduleIndex
+) -> Tuple[List[shared_memory.SharedMemory], ScheduleIndex]:
+    """ Read-only ScheduleIndex backed by shared memory, keep
+    the returned blocks alive for as long as the index is used """
+    dates_block, dates = _attach_array(shared.dates)
+    cumulative_block, cumulative = _attach_array(shared.cumulative)
+    return (
+        [dates_block, cumulative_block],
+        ScheduleIndex.from_arrays(
+            dates.view('datetime64[ns]'), shared.team_ids, cumulative
+        )
+    )
+
+
+# Per-process state, set up once per worker by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(
+    shared_schedule: Optional[SharedScheduleIndex],
+    team_id_name_mapping: dict,
+    cache_path: Optional[Path],
+    fetch_workers: int
+) -> None:
+    if shared_schedule is not None:
+        _worker['blocks'], _worker['schedule'] = attach_schedule_index(
+            shared_schedule
+        )
+    else:
+        _worker['schedule'] = constants.get_schedule_index()
+    _worker['team_id_name_mapping'] = team_id_name_mapping
+    # SQLite connections can't cross processes, each worker opens its own
+    _worker['cache'] = (
+        PayloadCache(cache_path) if cache_path is not None else None
+    )
+    _worker['client'] = (
+        FetchClient(max_workers=fetch_workers) if fetch_workers > 0 else None
+    )
+
+
+def summarize_league(
+    config: LeagueConfig,
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    include_dtdq=False,
+    include_o=False
+) -> LeagueResults:
+    """ League summary, weekly projections over every date range
+    and (if draft rosters are given) a draft summary for one league """
+    try:
+        league = espn_stats.build_league(
+            league_id=config.league_id, year=config.year,
+            espn_s2=config.espn_s2, swid=config.swid,
+            cache=_worker.get('cache'), client=_worker.get('client')
+        )
+        summary = espn_stats.summarize_league_per_team(
+            league, include_dtdq=include_dtdq, include_o=include_o
+        )
+        weekly = espn_stats.get_weekly_stats_league_ranges(
+            league, date_ranges,
+            team_id_name_mapping=_worker['team_id_name_mapping'],
+            schedule=_worker['schedule'],
+            include_dtdq=include_dtdq, include_o=include_o
+        )
+        draft_summary = None
+        if config.draft_rosters is not None:
+            draft_summary = espn_stats.summarize_league_draft(
+                league, config.draft_rosters,
+                all_player_stats=espn_stats.get_pool_player_stats(league)
+            )
+    except Exception:
+        return LeagueResults(
+            config.league_id, config.year, error=traceback.format_exc()
+        )
+
+    return LeagueResults(
+        config.league_id, config.year,
+        summary=summary, weekly=weekly, draft_summary=draft_summary
+    )
+
+
+def _summarize_league_task(args) -> LeagueResults:
+    return summarize_league(*args)
+
+
+def summarize_leagues(
+    configs: List[LeagueConfig],
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    max_workers: Optional[int] = None,
+    cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+    fetch_workers: int = 4,
+    include_dtdq=False,
+    include_o=False
+) -> List[LeagueResults]:
+    """ Summarize many leagues in parallel, one league per task,
+    results in the same order as `configs`
+
+    The schedule index is placed in shared memory once and attached
+    by every worker, the team mapping is sent once per worker rather
+    than with every task. A league that fails returns its traceback
+    in `error` instead of stopping the batch. With max_workers=1
+    leagues are summarized in this process """
+    if max_workers is None:
+        max_workers = min(len(configs), os.cpu_count() or 1)
+    team_id_name_mapping = constants.get_team_name_mapping()
+    tasks = [
+        (config, date_ranges, include_dtdq, include_o) for config in configs
+    ]
+
+    if max_workers <= 1:
+        _init_worker(None, team_id_name_mapping, cache_path, fetch_workers)
+        return [_summarize_league_task(task) for task in tasks]
+
+    blocks, shared_schedule = share_schedule_index(constants.get_schedule_index())
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(
+                shared_schedule, team_id_name_mapping, cache_path, fetch_workers
+            )
+        ) as executor:
+            return list(executor.map(_summarize_league_task, tasks))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
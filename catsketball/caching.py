@@ -0,0 +1,29 @@
+import functools
+import sys
+from typing import Callable
+
+
+def cache_data(func: Callable) -> Callable:
+    """ `st.cache_data` when running inside the streamlit app,
+    a plain function call everywhere else
+
+    Streamlit is only imported by the app, so modules decorated with
+    this stay importable (and fast to import) without it. The
+    streamlit cache is built on first call once streamlit is loaded """
+    cached = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal cached
+        if cached is None:
+            if "streamlit" not in sys.modules:
+                return func(*args, **kwargs)
+            cached = sys.modules["streamlit"].cache_data(func)
+        return cached(*args, **kwargs)
+
+    def clear() -> None:
+        if cached is not None:
+            cached.clear()
+
+    wrapper.clear = clear
+    return wrapper
@@ -0,0 +1,188 @@
+""" Write league summaries, weekly H2H projections and draft summaries
+for one or more ESPN leagues, without streamlit
+
+    python catsketball/cli.py --league 12345 --start 2025-01-06 --end 2025-02-03
+    python catsketball/cli.py --leagues-file leagues.yaml --format parquet csv
+    python catsketball/cli.py --league 12345 --game-logs
+
+Cookies default to the ESPN_S2 and SWID environment variables.
+Each league is written to <output-dir>/<league_id>_<year>/ and
+weekly projections cover the Monday-to-Monday weeks between
+--start and --end. --game-logs also appends the scoring periods
+completed since the last run to the local game log store, through
+the first league. Exits non-zero if any league failed. """
+import argparse
+import datetime
+import os
+from pathlib import Path
+import sys
+from typing import List, Optional
+
+import pandas as pd
+
+import batch
+from espn_cache import DEFAULT_CACHE_PATH, PayloadCache
+from simulation import matchup_weeks
+
+FORMATS = ["parquet", "csv", "json"]
+
+
+def _date(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value, "%Y-%m-%d")
+
+
+def write_frame(df: pd.DataFrame, path: Path, output_format: str) -> Path:
+    """ Write a result table as parquet, csv or json
+    (json uses the table schema, so the index survives a round trip) """
+    path = path.with_suffix(f".{output_format}")
+    if output_format == "parquet":
+        df.to_parquet(path)
+    elif output_format == "csv":
+        df.to_csv(path)
+    elif output_format == "json":
+        df.to_json(path, orient="table", date_format="iso", indent=2)
+    else:
+        raise ValueError(f"Unknown format {output_format}")
+    return path
+
+
+def write_results(
+    results: batch.LeagueResults,
+    output_dir: Path,
+    output_formats: List[str]
+) -> List[Path]:
+    league_dir = Path(output_dir) / f"{results.league_id}_{results.year}"
+    league_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name in ["summary", "weekly", "draft_summary"]:
+        df = getattr(results, name)
+        if df is None:
+            continue
+        for output_format in output_formats:
+            written.append(write_frame(df, league_dir / name, output_format))
+    return written
+
+
+def ingest_game_logs(
+    config: batch.LeagueConfig,
+    game_log_dir: Optional[Path] = None,
+    cache_path: Optional[Path] = None
+) -> int:
+    """ Append new game logs through one league, returns 1 on failure """
+    import espn_stats
+    import gamelog
+
+    store = gamelog.GameLogStore(
+        gamelog.GAMELOG_DIR if game_log_dir is None else game_log_dir
+    )
+    try:
+        league = espn_stats.build_league(
+            league_id=config.league_id,
+            year=config.year,
+            espn_s2=config.espn_s2,
+            swid=config.swid,
+            cache=PayloadCache(cache_path) if cache_path is not None else None
+        )
+        n_games = store.ingest(league)
+    except Exception as e:
+        print(f"Game log ingestion failed: {e!r}", file=sys.stderr)
+        return 1
+    print(f"{n_games} games added to {store.root / f'year={config.year}'}")
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:])
+    )
+    leagues = parser.add_mutually_exclusive_group(required=True)
+    leagues.add_argument("--league", type=int, nargs="+", help="ESPN league ids")
+    leagues.add_argument(
+        "--leagues-file", type=Path,
+        help="YAML list of leagues, see batch.load_league_configs"
+    )
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--espn-s2", default=os.environ.get("ESPN_S2"))
+    parser.add_argument("--swid", default=os.environ.get("SWID"))
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    parser.add_argument(
+        "--start", type=_date, default=today, help="YYYY-MM-DD, default today"
+    )
+    parser.add_argument(
+        "--end", type=_date, default=None,
+        help="YYYY-MM-DD (not included), default a week from --start"
+    )
+    parser.add_argument("--output-dir", type=Path, default=Path("reports"))
+    parser.add_argument(
+        "--format", nargs="+", default=["parquet"], choices=FORMATS,
+        dest="formats"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="processes, default one per league up to the number of cores"
+    )
+    parser.add_argument(
+        "--cache-path", type=Path, default=DEFAULT_CACHE_PATH,
+        help="ESPN payload cache shared with the app"
+    )
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--game-logs", action="store_true",
+        help="also ingest new game logs, see gamelog.GameLogStore"
+    )
+    parser.add_argument("--game-log-dir", type=Path, default=None)
+    parser.add_argument("--include-dtdq", action="store_true")
+    parser.add_argument("--include-o", action="store_true")
+    args = parser.parse_args(argv)
+    if args.end is None:
+        args.end = args.start + datetime.timedelta(days=7)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.leagues_file is not None:
+        configs = batch.load_league_configs(args.leagues_file)
+    else:
+        configs = [
+            batch.LeagueConfig(league_id, args.year, args.espn_s2, args.swid)
+            for league_id in args.league
+        ]
+    if args.end <= args.start:
+        print("--end must be after --start", file=sys.stderr)
+        return 2
+
+    all_results = batch.summarize_leagues(
+        configs, matchup_weeks(args.start, args.end),
+        max_workers=args.workers,
+        cache_path=None if args.no_cache else args.cache_path,
+        include_dtdq=args.include_dtdq,
+        include_o=args.include_o
+    )
+
+    n_failed = 0
+    for results in all_results:
+        if results.error is not None:
+            n_failed += 1
+            print(
+                f"League {results.league_id} ({results.year}) failed:\n"
+                f"{results.error}",
+                file=sys.stderr
+            )
+            continue
+        for path in write_results(results, args.output_dir, args.formats):
+            print(path)
+
+    if args.game_logs:
+        n_failed += ingest_game_logs(
+            configs[0], args.game_log_dir,
+            cache_path=None if args.no_cache else args.cache_path
+        )
+
+    return 1 if n_failed > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
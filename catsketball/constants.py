@@ -1,24 +1,64 @@
 from pathlib import Path
+import threading
+from typing import Any, Callable, Dict
 
 import pandas as pd
-import yaml
 
+from schedule import ScheduleIndex
+
+
+STATICDATA_DIR = Path(__file__).parent / "staticdata"
 
 keep_keys = [
-    'PTS', 'BLK', "STL", "REB", 'AST', 'TO', 
+    'PTS', 'BLK', "STL", "REB", 'AST', 'TO',
     'FGM', 'FGA', 'FTM', 'FTA', '3PM'
 ]
+# Categories of a 9-cat league, turnovers count against a team
+CATEGORIES = ['FG%', 'FT%', '3PM', 'REB', 'AST', 'STL', 'BLK', 'TO', 'PTS']
+LOWER_IS_BETTER = ['TO']
 
 
 def load_team_name_mapping():
+    import yaml
     with open(
-        Path(__file__).parent / "staticdata/team_id_mappings.yaml", 'r'
+        STATICDATA_DIR / "team_id_mappings.yaml", 'r'
     ) as f:
         return yaml.safe_load(f)
 
 def load_pro_schedule():
-    temp = pd.read_csv(
-        Path(__file__).parent / "staticdata/nba_schedule.csv", 
-        index_col=0, parse_dates=True
-    )
-    return temp
\ No newline at end of file
+    import pro_schedule
+    return pro_schedule.load_schedule(STATICDATA_DIR / "nba_schedule.npz")
+
+
+# Process-wide static data, loaded on first use
+_static_data: Dict[str, Any] = {}
+_static_data_lock = threading.RLock()
+
+
+def _get_static(name: str, loader: Callable[[], Any]) -> Any:
+    """ Load static data once per process """
+    with _static_data_lock:
+        if name not in _static_data:
+            _static_data[name] = loader()
+        return _static_data[name]
+
+
+def clear_static_data() -> None:
+    """ Drop this process's copies of the static data, so the next
+    use loads the files in staticdata/ again """
+    with _static_data_lock:
+        _static_data.clear()
+
+
+def get_team_name_mapping() -> dict:
+    """ Shared team id <-> abbreviation mapping, do not modify """
+    return _get_static("team_name_mapping", load_team_name_mapping)
+
+def get_pro_schedule() -> pd.DataFrame:
+    """ Shared NBA schedule, dates x team ids, do not modify """
+    return _get_static("pro_schedule", lambda: load_pro_schedule().frame())
+
+def get_schedule_index() -> ScheduleIndex:
+    """ Shared cumulative games-per-team index of the NBA schedule,
+    built straight from the stored games matrix """
+    return _get_static("schedule_index", lambda: load_pro_schedule().to_index())
@@ -0,0 +1,122 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from constants import LOWER_IS_BETTER
+from projection_sources import STAT_COLS
+from stat_analysis import ProjectionsStore
+
+# Percentage categories and the made / attempted columns behind them
+VOLUME_COLS = {"FG%": ("FGM", "FGA"), "FT%": ("FTM", "FTA")}
+
+
+class DraftRecommender:
+    """ Rank available players by what they add to one drafting team
+
+    Counting categories are z-scores against the undrafted pool, read
+    from the store's incrementally updated standardizer. FG% and FT% are
+    makes above the team's current percentage on the player's attempts
+    (the pool's percentage while the team has none), standardized over
+    the undrafted pool, so volume counts and a team's existing
+    percentages shift who helps it. Weights scale each category,
+    punted categories count for nothing.
+
+    Nothing is kept sorted: after a pick the gains are recomputed in one
+    pass over the pool and only the top players are partially sorted
+    out of it with argpartition """
+    def __init__(
+        self,
+        store: ProjectionsStore,
+        team: int,
+        weights: Optional[Dict[str, float]] = None,
+        punt: Iterable[str] = ()
+    ):
+        self.store = store
+        self.team = int(team)
+        # Turnovers count against a player
+        self.signs = np.array([
+            -1.0 if stat in LOWER_IS_BETTER else 1.0 for stat in STAT_COLS
+        ])
+        self.weights = self.signs * np.array([
+            0.0 if stat in punt else (weights or {}).get(stat, 1.0)
+            for stat in STAT_COLS
+        ])
+        # (players, 2) makes and attempts for each percentage category,
+        # NaN where the source only has percentages
+        self.volumes = {
+            stat: np.column_stack([
+                store.metadata[col].to_numpy(zero_copy_only=False).astype(np.float64)
+                for col in cols
+            ])
+            for stat, cols in VOLUME_COLS.items()
+        }
+
+    def pick(self, idx: int, drafted_by: Optional[int]) -> None:
+        """ Record one draft pick (or undo one with 0 / None)"""
+        self.store.apply_edits({idx: {"drafted_by": drafted_by}})
+
+    def team_mask(self) -> np.ndarray:
+        return self.store.drafted_by == self.team
+
+    def category_gains(self) -> np.ndarray:
+        """ (players, STAT_COLS) unweighted gain of adding each player """
+        standardizer = self.store.standardizer
+        available = standardizer.available
+        gains = (self.store.stats - standardizer.mean_) / standardizer.scale_
+        on_team = self.team_mask()
+        for stat, volumes in self.volumes.items():
+            has_volume = ~np.isnan(volumes).any(axis=1)
+            made, attempted = np.where(has_volume[:, np.newaxis], volumes, 0.0).T
+            team_made, team_attempted = made[on_team].sum(), attempted[on_team].sum()
+            if team_attempted == 0:
+                team_made = made[available].sum()
+                team_attempted = attempted[available].sum()
+            pct = team_made / team_attempted if team_attempted > 0 else 0.0
+            impact = made - pct * attempted
+            reference = available & has_volume
+            if not reference.any():
+                continue
+            scale = impact[reference].std()
+            if scale < 10 * np.finfo(np.float64).eps:
+                scale = 1.0
+            i = STAT_COLS.index(stat)
+            # Percentages alone, z-scored above, where volume is missing
+            gains[:, i] = np.where(
+                has_volume, (impact - impact[reference].mean()) / scale, gains[:, i]
+            )
+        return np.nan_to_num(gains)
+
+    def scores(self, gains: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Weighted gain of every player, -inf once drafted"""
+        if gains is None:
+            gains = self.category_gains()
+        return np.where(self.store.available(), gains @ self.weights, -np.inf)
+
+    def best_available(
+        self, 
+        top: int = 10, 
+        scores: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """ Row indices of the `top` highest scoring available players,
+        best first """
+        if scores is None:
+            scores = self.scores()
+        top = min(top, int(self.store.available().sum()))
+        if top <= 0:
+            return np.array([], dtype=int)
+        best = np.argpartition(-scores, top - 1)[:top]
+        return best[np.argsort(-scores[best], kind="stable")]
+
+    def recommend(self, top: int = 10) -> pd.DataFrame:
+        """ Best available players with their score and category gains"""
+        gains = self.category_gains()
+        scores = self.scores(gains)
+        best = self.best_available(top, scores)
+        # Signed so that a positive gain always helps the team
+        df = pd.DataFrame(gains[best] * self.signs, columns=STAT_COLS)
+        df.insert(0, "Score", scores[best])
+        for col in ["POS", "RNK", "PLAYER"]:
+            df.insert(0, col, self.store.metadata[col].take(best).to_pylist())
+        df.index = pd.Index(best, name="row")
+        return df
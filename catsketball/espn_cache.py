@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+from espn_api.requests.espn_requests import EspnFantasyRequests
+
+from instrumentation import count, span
+
+DEFAULT_CACHE_PATH = (
+    Path(os.environ.get("CATSKETBALL_CACHE_DIR", Path.home() / ".cache/catsketball"))
+    / "espn_payloads.sqlite"
+)
+# Seconds before a cached ESPN view is considered stale.
+# Views requested together are stale once the shortest-lived view is.
+DEFAULT_TTLS = {
+    'mTeam': 15 * 60,
+    'mRoster': 15 * 60,
+    'mMatchup': 15 * 60,
+    'mSettings': 24 * 60 * 60,
+    'mStandings': 60 * 60,
+    'mDraftDetail': 24 * 60 * 60,
+    'proTeamSchedules_wl': 24 * 60 * 60,
+    'players_wl': 24 * 60 * 60,
+    'kona_player_info': 60 * 60,
+}
+DEFAULT_TTL = 15 * 60
+
+
+def _views(params: Optional[dict]) -> list:
+    view = (params or {}).get('view', [])
+    return [view] if isinstance(view, str) else list(view)
+
+
+def payload_key(
+    league_id: int,
+    year: int,
+    endpoint: str,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    extend: str = '',
+    cookies: Optional[dict] = None
+) -> str:
+    """ Stable key for one ESPN request
+
+    Cookies are hashed into the key so private league payloads
+    are only served back to requests made with the same cookies """
+    request = {
+        'league_id': league_id,
+        'year': year,
+        'endpoint': endpoint,
+        'params': params or {},
+        'filter': (headers or {}).get('x-fantasy-filter'),
+        'extend': extend,
+        'cookies': cookies or {},
+    }
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class PayloadCache:
+    """ SQLite store of raw ESPN JSON responses with per-view TTLs
+
+    Shared across reruns and across restarts of the app.
+    Set `default_ttl=float('inf')` to replay recorded payloads offline """
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = Path(path)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if str(path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS payloads (
+                key TEXT PRIMARY KEY,
+                league_id INTEGER,
+                year INTEGER,
+                view TEXT,
+                scoring_period INTEGER,
+                fetched_at REAL,
+                payload TEXT
+            )"""
+        )
+        self._connection.commit()
+
+    def ttl(self, params: Optional[dict]) -> float:
+        views = _views(params)
+        if len(views) == 0:
+            return self.default_ttl
+        return min(self.ttls.get(view, self.default_ttl) for view in views)
+
+    def is_fresh(self, key: str, params: Optional[dict] = None) -> bool:
+        """ Whether a fresh payload is cached, without counting a hit/miss """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fetched_at FROM payloads WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and (self.clock() - row[0]) <= self.ttl(params)
+
+    def get(self, key: str, params: Optional[dict] = None):
+        """ Cached payload if present and fresh, otherwise None """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fetched_at, payload FROM payloads WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.clock() - row[0]) > self.ttl(params):
+                self.misses += 1
+                count("espn_cache.misses")
+                return None
+            self.hits += 1
+            count("espn_cache.hits")
+        return json.loads(row[1])
+
+    def fetched_at(self, key: str) -> Optional[float]:
+        """ When the payload under `key` was stored, fresh or not """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fetched_at FROM payloads WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def put(
+        self,
+        key: str,
+        payload,
+        league_id: int,
+        year: int,
+        params: Optional[dict] = None
+    ) -> None:
+        params = params or {}
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO payloads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, league_id, year, ",".join(_views(params)),
+                    params.get('scoringPeriodId'), self.clock(),
+                    json.dumps(payload)
+                )
+            )
+            self._connection.commit()
+
+    def invalidate(self, league_id: Optional[int] = None, view: Optional[str] = None) -> None:
+        """ Drop cached payloads for a league and/or a view, or everything """
+        clauses, args = [], []
+        if league_id is not None:
+            clauses.append("league_id = ?")
+            args.append(league_id)
+        if view is not None:
+            clauses.append("(',' || view || ',') LIKE ?")
+            args.append(f"%,{view},%")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            self._connection.execute(f"DELETE FROM payloads{where}", args)
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0.0,
+        }
+
+    def export_payloads(self, directory: Path) -> None:
+        """ Write every cached payload as a JSON fixture file """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, league_id, year, view, scoring_period, payload FROM payloads"
+            ).fetchall()
+        for key, league_id, year, view, scoring_period, payload in rows:
+            with open(directory / f"{key}.json", 'w') as f:
+                json.dump({
+                    'key': key,
+                    'league_id': league_id,
+                    'year': year,
+                    'view': view,
+                    'scoring_period': scoring_period,
+                    'payload': json.loads(payload),
+                }, f)
+
+    def import_payloads(self, directory: Path) -> None:
+        """ Load JSON fixture files written by export_payloads """
+        for fixture_path in sorted(Path(directory).glob("*.json")):
+            with open(fixture_path, 'r') as f:
+                fixture = json.load(f)
+            params = {'view': fixture['view'].split(",") if fixture['view'] else []}
+            if fixture['scoring_period'] is not None:
+                params['scoringPeriodId'] = fixture['scoring_period']
+            self.put(
+                fixture['key'], fixture['payload'],
+                fixture['league_id'], fixture['year'], params=params
+            )
+
+
+class CachedEspnRequests(EspnFantasyRequests):
+    """ espn_api request layer that serves responses from a PayloadCache """
+    def __init__(self, cache: PayloadCache, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        # Keys of every payload served, for snapshot_version
+        self.served: Set[str] = set()
+
+    def _cached(self, endpoint: str, fetch, params=None, headers=None, extend=''):
+        key = payload_key(
+            self.league_id, self.year, endpoint, params=params,
+            headers=headers, extend=extend, cookies=self.cookies
+        )
+        self.served.add(key)
+        payload = self.cache.get(key, params)
+        if payload is None:
+            count("espn.requests")
+            with span("espn.request"):
+                payload = fetch(params=params, headers=headers, extend=extend)
+            self.cache.put(key, payload, self.league_id, self.year, params=params)
+        return payload
+
+    def snapshot_version(self) -> str:
+        """ Digest of when each served payload was fetched, changes
+        whenever anything served so far is refetched from ESPN """
+        versions = sorted(
+            (key, self.cache.fetched_at(key)) for key in self.served
+        )
+        return hashlib.sha256(json.dumps(versions).encode()).hexdigest()[:16]
+
+    def league_get(self, params: dict = None, headers: dict = None, extend: str = ''):
+        return self._cached(
+            'league', super().league_get,
+            params=params, headers=headers, extend=extend
+        )
+
+    def get(self, params: dict = None, headers: dict = None, extend: str = ''):
+        return self._cached(
+            'season', super().get,
+            params=params, headers=headers, extend=extend
+        )
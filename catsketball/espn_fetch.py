@@ -0,0 +1,276 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from espn_api.requests.espn_requests import EspnFantasyRequests
+
+from espn_cache import PayloadCache, payload_key
+from instrumentation import count, timed
+
+
+class EspnRequest(NamedTuple):
+    """ One ESPN GET, described the same way espn_api issues it """
+    endpoint: str  # 'league' or 'season', as in payload_key
+    params: dict
+    headers: Optional[dict] = None
+    extend: str = ''
+
+
+def league_requests() -> List[EspnRequest]:
+    """ Requests espn_api makes while constructing a basketball League """
+    return [
+        EspnRequest(
+            'league',
+            {'view': ['mTeam', 'mRoster', 'mMatchup', 'mSettings', 'mStandings']}
+        ),
+        EspnRequest('season', {'view': 'proTeamSchedules_wl'}),
+        EspnRequest(
+            'season', {'view': 'players_wl'},
+            headers={'x-fantasy-filter': json.dumps({"filterActive": {"value": True}})},
+            extend='/players'
+        ),
+        EspnRequest('league', {'view': 'mDraftDetail'}),
+    ]
+
+
+def player_pool_request(week: int, size: int = 400) -> EspnRequest:
+    """ kona_player_info request for the `size` most owned players """
+    filters = {
+        "players":{
+            "limit": size,
+            "sortPercOwned": {"sortPriority": 1, "sortAsc": False},
+            "sortDraftRanks": {
+                "sortPriority": 100, "sortAsc": True, "value": "STANDARD"
+            }
+        }
+    }
+    return EspnRequest(
+        'league',
+        {'view': 'kona_player_info', 'scoringPeriodId': week},
+        headers={'x-fantasy-filter': json.dumps(filters)}
+    )
+
+
+def player_card_request(
+    player_ids: List[int],
+    scoring_period: int,
+    n_periods: int
+) -> EspnRequest:
+    """ kona_playercard request for the stats of the `n_periods`
+    scoring periods up to `scoring_period`, one split per game """
+    filters = {
+        "players": {
+            "filterIds": {"value": list(player_ids)},
+            "filterStatsForTopScoringPeriodIds": {"value": n_periods},
+        }
+    }
+    return EspnRequest(
+        'league',
+        {'view': 'kona_playercard', 'scoringPeriodId': scoring_period},
+        headers={'x-fantasy-filter': json.dumps(filters)}
+    )
+
+
+def current_week(league_payload: dict) -> int:
+    """ Same current_week that espn_api derives for a League """
+    status = league_payload['status']
+    return min(league_payload['scoringPeriodId'], status['finalScoringPeriod'])
+
+
+class RateLimiter:
+    """ Token bucket shared by all fetch threads """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchClient:
+    """ Concurrent ESPN client with connection reuse,
+    retry with exponential backoff and a request rate limit """
+    def __init__(
+        self,
+        max_workers: int = 8,
+        rate: float = 20.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0
+    ):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_workers,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=["GET"],
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.limiter = RateLimiter(rate, burst=max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    @timed("espn.request")
+    def get_json(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        cookies: Optional[dict] = None
+    ):
+        self.limiter.acquire()
+        with self._count_lock:
+            self.request_count += 1
+        count("espn.requests")
+        r = self.session.get(
+            url, params=params, headers=headers, cookies=cookies,
+            timeout=self.timeout
+        )
+        r.raise_for_status()
+        return r.json()
+
+    def fetch(self, espn_request: EspnFantasyRequests, request: EspnRequest):
+        """ Issue one request the way espn_api's league_get/get would """
+        base = (
+            espn_request.LEAGUE_ENDPOINT if request.endpoint == 'league'
+            else espn_request.ENDPOINT
+        )
+        payload = self.get_json(
+            base + request.extend, params=request.params,
+            headers=request.headers, cookies=espn_request.cookies
+        )
+        if request.endpoint == 'league' and isinstance(payload, list):
+            return payload[0]
+        return payload
+
+    def submit(self, espn_request: EspnFantasyRequests, request: EspnRequest) -> Future:
+        # Copy the caller's context, so requests count towards its rerun
+        return self.executor.submit(
+            contextvars.copy_context().run, self.fetch, espn_request, request
+        )
+
+    def fetch_many(
+        self,
+        espn_request: EspnFantasyRequests,
+        requests_to_fetch: Iterable[EspnRequest]
+    ) -> list:
+        """ Fetch many requests concurrently, results in the same order """
+        futures = [
+            self.submit(espn_request, request) for request in requests_to_fetch
+        ]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+def request_key(espn_request: EspnFantasyRequests, request: EspnRequest) -> str:
+    """ PayloadCache key that CachedEspnRequests would use for `request` """
+    return payload_key(
+        espn_request.league_id, espn_request.year, request.endpoint,
+        params=request.params, headers=request.headers,
+        extend=request.extend, cookies=espn_request.cookies
+    )
+
+
+def _is_cached(
+    cache: PayloadCache,
+    espn_request: EspnFantasyRequests,
+    request: EspnRequest
+) -> bool:
+    return cache.is_fresh(request_key(espn_request, request), request.params)
+
+
+def prefetch_league(
+    client: FetchClient,
+    cache: PayloadCache,
+    espn_request: EspnFantasyRequests,
+    player_pool_size: Optional[int] = 400
+) -> None:
+    """ Concurrently fetch everything a League (and pull_all_players)
+    needs into `cache`, so constructing the League afterwards is
+    served without further ESPN round trips
+
+    The player pool request depends on the current scoring period,
+    so it is issued as soon as the league payload arrives while the
+    other views are still in flight. Failed requests are left for
+    espn_api to retry with its own error handling """
+    league_request, *other_requests = league_requests()
+    pending = [
+        (request, client.submit(espn_request, request))
+        for request in [league_request, *other_requests]
+        if not _is_cached(cache, espn_request, request)
+    ]
+    if player_pool_size is not None and pending[:1] and pending[0][0] is league_request:
+        try:
+            league_payload = pending[0][1].result()
+            pool_request = player_pool_request(
+                current_week(league_payload), size=player_pool_size
+            )
+            if not _is_cached(cache, espn_request, pool_request):
+                pending.append(
+                    (pool_request, client.submit(espn_request, pool_request))
+                )
+        except (requests.RequestException, KeyError):
+            pass
+    for request, future in pending:
+        try:
+            cache.put(
+                request_key(espn_request, request), future.result(),
+                espn_request.league_id, espn_request.year,
+                params=request.params
+            )
+        except requests.RequestException:
+            continue
+
+
+def parse_pro_schedule(payload: dict) -> Dict[int, Dict[int, Tuple[int, int]]]:
+    """ Every scoring period's games from one proTeamSchedules_wl payload
+
+    Maps scoring period -> NBA team id -> (opponent id, timestamp in ms),
+    the same per-period structure as League._get_pro_schedule but without
+    re-requesting the whole schedule for each scoring period """
+    schedule = {}
+    for team in payload.get('settings', {}).get('proTeams', []):
+        if team['id'] == 0:
+            continue
+        for period, games in team.get('proGamesByScoringPeriod', {}).items():
+            if not games:
+                continue
+            game = games[0]
+            opponent = (
+                game['homeProTeamId'] if team['id'] == game['awayProTeamId']
+                else game['awayProTeamId']
+            )
+            schedule.setdefault(int(period), {})[team['id']] = (
+                opponent, game['date']
+            )
+    return schedule
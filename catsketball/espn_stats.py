@@ -1,25 +1,39 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import datetime
-import json
-from typing import Dict, List, Optional
+import itertools
+import threading
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
-import streamlit as st
 import warnings
 from espn_api.basketball import Player, League, Team
 
+from caching import cache_data
 import constants
+from instrumentation import count, span, timed
+from espn_cache import CachedEspnRequests, PayloadCache
+from espn_fetch import FetchClient, player_pool_request, prefetch_league
+from schedule import ScheduleIndex
 
 YEAR = '2025'
+# Per-game estimates that get averaged together for each player
+STAT_SOURCES = [YEAR, f'{YEAR}_projected', f'{YEAR}_last_30']
+AVG_STAT_COLS = [*constants.keep_keys, 'FG%', 'FT%']
 
 def get_num_games(
-    schedule: pd.DataFrame, 
+    schedule: Union[pd.DataFrame, ScheduleIndex], 
     team_id: int, 
     start_date: datetime.datetime, 
     end_date: datetime.datetime
 ):
     """ Find number of games for a particular NBA team
     
-    start_date <= date_range < end_date """
+    start_date <= date_range < end_date 
+    
+    Prefer passing a ScheduleIndex when counting games repeatedly,
+    the DataFrame path masks the entire schedule on every call """
+    if isinstance(schedule, ScheduleIndex):
+        return schedule.num_games(team_id, start_date, end_date)
     date_filter = (
         (start_date <= schedule.index) &
         (schedule.index < end_date)
@@ -61,7 +75,7 @@ def get_avg_stats_player(player: Player, include_dtdq=False, include_o=False):
             stat_estimates.append(
                 {
                     k: player.stats[YEAR]['avg'].get(k, 0)
-                    for k in contants.keep_keys
+                    for k in constants.keep_keys
                 }
             )
     if f'{YEAR}_projected' in player.stats:
@@ -110,25 +124,24 @@ def get_weekly_stats_player(
     start_date: datetime.datetime, 
     end_date: datetime.datetime, 
     team_id_name_mapping: Optional[dict] = None, 
-    schedule: Optional[pd.DataFrame] = None,
+    schedule: Optional[Union[pd.DataFrame, ScheduleIndex]] = None,
     include_dtdq=False,
-    include_o=False
+    include_o=False,
+    version: Optional[Hashable] = None
 ):
-    """ Given a time range, predict categories"""
+    """ Given a time range, predict categories
+
+    With a `version` (see PlayerStatCache), per-game averages are
+    served from player_stat_cache """
     if team_id_name_mapping is None:
-        team_id_name_mapping = constants.load_team_name_mapping()
+        team_id_name_mapping = constants.get_team_name_mapping()
     if schedule is None:
-        schedule = constants.load_pro_schedule()
+        schedule = constants.get_schedule_index()
         
     team_id = team_id_name_mapping[player.proTeam.upper()]
     num_games = get_num_games(schedule, team_id, start_date, end_date)
-    player_avg_stats = get_avg_stats_player(player, include_dtdq=include_dtdq, include_o=include_o)
     # Ignore player if injured or IR
-    if (
-        (player.lineupSlot=="IR") or
-        (_is_out(player) and not include_o) or
-        (_is_dtdq(player) and not include_dtdq)
-    ):
+    if get_ignored_mask([player], include_dtdq=include_dtdq, include_o=include_o)[0]:
         relevant_stats = {
             k: 0
             for k in constants.keep_keys
@@ -137,6 +150,15 @@ def get_weekly_stats_player(
         relevant_stats['FT%'] = 0
     
     else:
+        if version is None:
+            player_avg_stats = get_avg_stats_player(
+                player, include_dtdq=True, include_o=True
+            )
+        else:
+            rows, has_stats = player_stat_cache.averages([player], version)
+            if not has_stats[0]:
+                warnings.warn(f"Can't find stats for player {player}")
+            player_avg_stats = dict(zip(AVG_STAT_COLS, rows[0]))
         relevant_stats = {
             k: num_games * player_avg_stats.get(k, 0)
             for k in constants.keep_keys
@@ -152,25 +174,175 @@ def get_weekly_stats_player(
     return relevant_stats
 
 
+def extract_stat_matrix(players: List[Player]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Pull every player's per-game estimates into one dense array
+    
+    Returns values of shape (players, keep_keys, STAT_SOURCES) and 
+    a (players, STAT_SOURCES) mask of which estimates ESPN provided """
+    n_keys = len(constants.keep_keys)
+    values = np.zeros((len(players), n_keys, len(STAT_SOURCES)))
+    available = np.zeros((len(players), len(STAT_SOURCES)), dtype=bool)
+    for i, player in enumerate(players):
+        for j, source in enumerate(STAT_SOURCES):
+            avg = player.stats.get(source, {}).get('avg')
+            if avg is None:
+                continue
+            values[i, :, j] = [avg.get(k, 0) for k in constants.keep_keys]
+            available[i, j] = True
+            
+    return values, available
+
+
+def get_ignored_mask(
+    players: List[Player], 
+    include_dtdq=False, 
+    include_o=False
+) -> np.ndarray:
+    """ Which players are on IR, or injured and excluded """
+    return np.array([
+        (player.lineupSlot == "IR") or 
+        (_is_out(player) and not include_o) or 
+        (_is_dtdq(player) and not include_dtdq)
+        for player in players
+    ], dtype=bool)
+
+
+def reduce_stat_matrix(
+    values: np.ndarray, 
+    available: np.ndarray, 
+    ignored: np.ndarray
+) -> np.ndarray:
+    """ Average each player's available estimates, 
+    same as get_avg_stats_player but for all players at once
+    
+    Returns an array of shape (players, AVG_STAT_COLS), 
+    ignored players and players without estimates are all zeros """
+    valid = available[:, np.newaxis, :] & ~np.isnan(values)
+    counts = valid.sum(axis=2)
+    sums = np.where(valid, values, 0.0).sum(axis=2)
+    means = np.divide(
+        sums, counts, out=np.zeros_like(sums), where=counts > 0
+    )
+    means[ignored] = 0.0
+    
+    fgm, fga, ftm, fta = (
+        means[:, constants.keep_keys.index(k)]
+        for k in ['FGM', 'FGA', 'FTM', 'FTA']
+    )
+    fg_pct = np.divide(fgm, fga, out=np.zeros_like(fgm), where=fga != 0)
+    ft_pct = np.divide(ftm, fta, out=np.zeros_like(ftm), where=fta != 0)
+    
+    return np.column_stack([means, fg_pct, ft_pct])
+    
+    
+class PlayerStatCache:
+    """ Per-game averages of players before any injury or IR masking,
+    keyed by (ESPN player id, stats version) and evicting the least
+    recently used players beyond `maxsize`
+
+    The version names the payloads the players' stats were parsed from
+    (see stats_version), so a League rebuilt from the same cached
+    payloads reuses every average. Injury and lineup slot are applied
+    as a mask afterwards, toggling include_dtdq / include_o only
+    re-masks instead of re-reading every player's stats """
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._rows: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def averages(
+        self, 
+        players: List[Player], 
+        version: Hashable
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ (players, AVG_STAT_COLS) unmasked averages, 
+        and whether ESPN had any estimate for each player """
+        keys = [(player.playerId, version) for player in players]
+        rows = np.zeros((len(players), len(AVG_STAT_COLS)))
+        has_stats = np.zeros(len(players), dtype=bool)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._rows.get(key)
+                if entry is None:
+                    missing.append(i)
+                    continue
+                self._rows.move_to_end(key)
+                rows[i], has_stats[i] = entry
+        count("player_stats.hits", len(players) - len(missing))
+        if len(missing) == 0:
+            return rows, has_stats
+
+        count("player_stats.misses", len(missing))
+        values, available = extract_stat_matrix([players[i] for i in missing])
+        rows[missing] = reduce_stat_matrix(
+            values, available, np.zeros(len(missing), dtype=bool)
+        )
+        has_stats[missing] = available.any(axis=1)
+        with self._lock:
+            for i in missing:
+                self._rows[keys[i]] = (rows[i].copy(), has_stats[i])
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+        return rows, has_stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+# Shared by every entry point that is given a stats version
+player_stat_cache = PlayerStatCache()
+
+
+@timed()
+def get_avg_stats_players(
+    players: List[Player], 
+    include_dtdq=False, 
+    include_o=False,
+    version: Optional[Hashable] = None
+) -> np.ndarray:
+    """ Per-game-averaged stats for many players at once,
+    rows follow `players` and columns follow AVG_STAT_COLS
+
+    With a `version` (see PlayerStatCache), averages are served 
+    from player_stat_cache and only the injury mask is recomputed """
+    if version is None:
+        values, available = extract_stat_matrix(players)
+        stats = reduce_stat_matrix(
+            values, available, np.zeros(len(players), dtype=bool)
+        )
+        has_stats = available.any(axis=1)
+    else:
+        stats, has_stats = player_stat_cache.averages(players, version)
+    ignored = get_ignored_mask(
+        players, include_dtdq=include_dtdq, include_o=include_o
+    )
+    for i in np.flatnonzero(~ignored & ~has_stats):
+        warnings.warn(f"Can't find stats for player {players[i]}")
+    stats[ignored] = 0.0
+        
+    return stats
+
+
 def get_avg_stats_roster(
     team_roster: List[Player], 
     include_dtdq=False, 
-    include_o=False
+    include_o=False,
+    version: Optional[Hashable] = None
 ):
     """ For a fantasy team, get per-game-averaged stats 
     for each player """
-    all_records = []
-    for player in team_roster:
-        player_stats = get_avg_stats_player(
-            player, include_dtdq=include_dtdq, include_o=include_o
-        )
-        player_stats['Name'] = player.name
-        all_records.append(player_stats)
-        
-    return (
-        pd.DataFrame(all_records)
-        .set_index("Name")
-        .fillna(0.0)
+    return pd.DataFrame(
+        get_avg_stats_players(
+            team_roster, include_dtdq=include_dtdq, include_o=include_o,
+            version=version
+        ),
+        index=pd.Index([player.name for player in team_roster], name="Name"),
+        columns=AVG_STAT_COLS
     )
 
 
@@ -179,14 +351,25 @@ def get_weekly_stats_roster(
     start_date: datetime.datetime, 
     end_date: datetime.datetime,
     include_dtdq=False,
-    include_o=False
+    include_o=False,
+    team_id_name_mapping: Optional[dict] = None, 
+    schedule: Optional[Union[pd.DataFrame, ScheduleIndex]] = None,
+    version: Optional[Hashable] = None
 ):
     """ For a fantasy team, project categories for roster """
+    if team_id_name_mapping is None:
+        team_id_name_mapping = constants.get_team_name_mapping()
+    if schedule is None:
+        schedule = constants.get_schedule_index()
     all_records = []
     for player in team.roster:
         entry = get_weekly_stats_player(
-            player, start_date, end_date, include_dtdq=include_dtdq, 
-            include_o=include_o
+            player, start_date, end_date, 
+            team_id_name_mapping=team_id_name_mapping,
+            schedule=schedule,
+            include_dtdq=include_dtdq, 
+            include_o=include_o,
+            version=version
         )
         entry['Name'] = player.name
         all_records.append(entry)
@@ -213,13 +396,20 @@ def get_weekly_stats_team(
     start_date: datetime.datetime, 
     end_date: datetime.datetime,
     include_dtdq=False,
-    include_o=False
+    include_o=False,
+    team_id_name_mapping: Optional[dict] = None, 
+    schedule: Optional[Union[pd.DataFrame, ScheduleIndex]] = None,
+    version: Optional[Hashable] = None
 ):
     """ Get weekly stats for an entire team"""
     to_return = reduce_roster_stats_to_team(
         get_weekly_stats_roster(
-            team, start_date, end_date, include_dtdq=include_dtdq,
-            include_o=include_o
+            team, start_date, end_date, 
+            team_id_name_mapping=team_id_name_mapping,
+            schedule=schedule,
+            include_dtdq=include_dtdq,
+            include_o=include_o,
+            version=version
         )
     )
     to_return['Name'] = team.team_name
@@ -236,18 +426,426 @@ def reduce_roster_stats_to_team(roster_stats: pd.DataFrame):
     return summed
     
     
+@timed()
 def summarize_league_per_team(league: League, include_dtdq=False, include_o=False):
     """ Give stats per team in the league"""
-    all_records = []
-    for team in league.teams:
-        record = get_avg_stats_team(
-            team, 
-            include_dtdq=include_dtdq, 
-            include_o=include_o
+    all_players = [player for team in league.teams for player in team.roster]
+    player_stats = get_avg_stats_players(
+        all_players, include_dtdq=include_dtdq, include_o=include_o,
+        version=stats_version(league)
+    )
+    team_positions = np.repeat(
+        np.arange(len(league.teams)), 
+        [len(team.roster) for team in league.teams]
+    )
+    team_totals = np.zeros((len(league.teams), len(constants.keep_keys)))
+    np.add.at(
+        team_totals, team_positions, 
+        player_stats[:, :len(constants.keep_keys)]
+    )
+    summary = pd.DataFrame(
+        team_totals, 
+        index=pd.Index([team.team_name for team in league.teams], name="Name"),
+        columns=constants.keep_keys
+    )
+    summary['FG%'] = summary['FGM'] / summary['FGA']
+    summary['FT%'] = summary['FTM'] / summary['FTA']
+    
+    return summary.fillna(0.0)
+
+
+def team_categories(team_totals: np.ndarray) -> np.ndarray:
+    """ Convert (..., keep_keys) totals to (..., CATEGORIES)
+    with made / attempted turned into percentages """
+    key_index = {k: i for i, k in enumerate(constants.keep_keys)}
+    columns = []
+    for category in constants.CATEGORIES:
+        if category in ('FG%', 'FT%'):
+            made = team_totals[..., key_index[category[:2] + 'M']]
+            attempted = team_totals[..., key_index[category[:2] + 'A']]
+            columns.append(np.divide(
+                made, attempted,
+                out=np.zeros_like(made), where=attempted > 0
+            ))
+        else:
+            columns.append(team_totals[..., key_index[category]])
+
+    return np.stack(columns, axis=-1)
+
+
+def rank_teams(categories: np.ndarray, teams: Optional[List[int]] = None) -> np.ndarray:
+    """ League rank (1 is best, ties share the best rank) in every category, 
+    from (..., teams, CATEGORIES) category values. Only the `teams` 
+    positions are ranked if given """
+    sign = np.array([
+        -1.0 if category in constants.LOWER_IS_BETTER else 1.0
+        for category in constants.CATEGORIES
+    ])
+    values = categories * sign
+    ranked = values if teams is None else values[..., teams, :]
+    better = values[..., np.newaxis, :, :] > ranked[..., :, np.newaxis, :]
+    return 1 + better.sum(axis=-2)
+
+
+class TradeAnalysis(NamedTuple):
+    """ Category deltas and league ranks of two teams for many trades
+
+    Arrays are indexed (trades, side, ...), side 0 is the first team 
+    and side 1 the second. `sent` holds the roster positions each side
+    sends, padded with -1. Rank gains are positive when a team moves 
+    up the league table """
+    team_names: Tuple[str, str]
+    player_names: Tuple[List[str], List[str]]
+    sent: np.ndarray  # (trades, side, players)
+    categories_before: np.ndarray  # (side, CATEGORIES)
+    ranks_before: np.ndarray  # (side, CATEGORIES)
+    deltas: np.ndarray  # (trades, side, CATEGORIES)
+    ranks_after: np.ndarray  # (trades, side, CATEGORIES)
+
+    def __len__(self):
+        return len(self.sent)
+
+    def trade(self, i: int) -> Tuple[List[str], List[str]]:
+        """ Names of the players each side sends in trade `i` """
+        return tuple(
+            [self.player_names[side][j] for j in self.sent[i, side] if j >= 0]
+            for side in (0, 1)
         )
-        record['Name'] = team.team_name
-        all_records.append(record)
-    return pd.DataFrame(all_records).set_index("Name").fillna(0.0)
+
+    def rank_gains(self) -> np.ndarray:
+        """ Sum over categories of ranks gained, (trades, side) """
+        return (self.ranks_before[np.newaxis] - self.ranks_after).sum(axis=-1)
+
+    def frame(self, top: Optional[int] = None) -> pd.DataFrame:
+        """ One row per trade (or the `top` trades), 
+        best for the first team first """
+        gains = self.rank_gains()
+        # Most ranks gained by the first team, then by the second
+        order = np.lexsort((-gains[:, 1], -gains[:, 0]))[:top]
+        trades = [self.trade(i) for i in order]
+        df = pd.DataFrame({
+            'Sends': [", ".join(sent) for sent, _ in trades],
+            'Receives': [", ".join(received) for _, received in trades],
+            f'{self.team_names[0]} rank gain': gains[order, 0],
+            f'{self.team_names[1]} rank gain': gains[order, 1],
+        }, index=pd.Index(order, name="trade"))
+        for i, category in enumerate(constants.CATEGORIES):
+            df[f'{category} delta'] = self.deltas[order, 0, i]
+        return df
+
+
+def _roster_index(team: Team, player: Union[str, int]) -> int:
+    """ Position on the roster of a player, by name or ESPN player id """
+    for i, roster_player in enumerate(team.roster):
+        if player in (roster_player.name, roster_player.playerId):
+            return i
+    raise KeyError(f"{player} is not on {team.team_name}")
+
+
+def _score_trades(
+    league: League,
+    team_a: Team,
+    team_b: Team,
+    sent_a: np.ndarray,
+    sent_b: np.ndarray,
+    include_dtdq=False,
+    include_o=False
+) -> TradeAnalysis:
+    """ Evaluate trades given as (trades, players) roster positions
+    sent by each team, padded with -1 """
+    teams = league.teams
+    a, b = teams.index(team_a), teams.index(team_b)
+    all_players = [player for team in teams for player in team.roster]
+    player_stats = get_avg_stats_players(
+        all_players, include_dtdq=include_dtdq, include_o=include_o,
+        version=stats_version(league)
+    )[:, :len(constants.keep_keys)]
+    offsets = np.cumsum([0, *[len(team.roster) for team in teams]])
+    team_totals = np.zeros((len(teams), len(constants.keep_keys)))
+    np.add.at(
+        team_totals, np.repeat(np.arange(len(teams)), np.diff(offsets)),
+        player_stats
+    )
+
+    # Trailing row of zeros for the -1 padding
+    padding = np.zeros((1, len(constants.keep_keys)))
+    stats_a = np.vstack([player_stats[offsets[a]:offsets[a + 1]], padding])
+    stats_b = np.vstack([player_stats[offsets[b]:offsets[b + 1]], padding])
+    sent_a_totals = stats_a[sent_a].sum(axis=1)
+    sent_b_totals = stats_b[sent_b].sum(axis=1)
+
+    # Only the two trading teams change, every other team is broadcast
+    after = np.broadcast_to(team_totals, (len(sent_a), *team_totals.shape)).copy()
+    after[:, a] += sent_b_totals - sent_a_totals
+    after[:, b] += sent_a_totals - sent_b_totals
+
+    categories_before = team_categories(team_totals)[[a, b]]
+    categories_after = team_categories(after)
+
+    return TradeAnalysis(
+        team_names=(team_a.team_name, team_b.team_name),
+        player_names=(
+            [player.name for player in team_a.roster],
+            [player.name for player in team_b.roster]
+        ),
+        sent=np.stack([sent_a, sent_b], axis=1),
+        categories_before=categories_before,
+        ranks_before=rank_teams(team_categories(team_totals), teams=[a, b]),
+        deltas=categories_after[:, [a, b]] - categories_before,
+        ranks_after=rank_teams(categories_after, teams=[a, b])
+    )
+
+
+@timed()
+def evaluate_trades(
+    league: League,
+    team_a: Team,
+    team_b: Team,
+    trades: List[Tuple[List[Union[str, int]], List[Union[str, int]]]],
+    include_dtdq=False,
+    include_o=False
+) -> TradeAnalysis:
+    """ Category deltas and league rank changes for both teams of each
+    trade, given as (players team_a sends, players team_b sends) by
+    name or ESPN player id. Stats are summed per-game averages, as in
+    summarize_league_per_team """
+    width = max([1, *[max(len(sent), len(received)) for sent, received in trades]])
+    sent_a = np.full((len(trades), width), -1, dtype=int)
+    sent_b = np.full((len(trades), width), -1, dtype=int)
+    for i, (sent, received) in enumerate(trades):
+        sent_a[i, :len(sent)] = [_roster_index(team_a, player) for player in sent]
+        sent_b[i, :len(received)] = [_roster_index(team_b, player) for player in received]
+
+    return _score_trades(
+        league, team_a, team_b, sent_a, sent_b,
+        include_dtdq=include_dtdq, include_o=include_o
+    )
+
+
+@timed()
+def search_trades(
+    league: League,
+    team_a: Team,
+    team_b: Team,
+    max_players: int = 2,
+    include_dtdq=False,
+    include_o=False
+) -> TradeAnalysis:
+    """ Evaluate every 1-for-1 up to every `max_players`-for-`max_players`
+    swap between two rosters at once """
+    sent_a, sent_b = [], []
+    for n in range(1, max_players + 1):
+        combos_a = np.array(list(itertools.combinations(range(len(team_a.roster)), n)), dtype=int)
+        combos_b = np.array(list(itertools.combinations(range(len(team_b.roster)), n)), dtype=int)
+        if len(combos_a) == 0 or len(combos_b) == 0:
+            continue
+        pad = ((0, 0), (0, max_players - n))
+        sent_a.append(np.pad(
+            np.repeat(combos_a, len(combos_b), axis=0), pad, constant_values=-1
+        ))
+        sent_b.append(np.pad(
+            np.tile(combos_b, (len(combos_a), 1)), pad, constant_values=-1
+        ))
+    if len(sent_a) == 0:
+        sent_a = sent_b = [np.zeros((0, max_players), dtype=int)]
+
+    return _score_trades(
+        league, team_a, team_b, np.vstack(sent_a), np.vstack(sent_b),
+        include_dtdq=include_dtdq, include_o=include_o
+    )
+
+
+def get_schedule_columns(
+    players: List[Union[Player, str]],
+    schedule: ScheduleIndex,
+    team_id_name_mapping: dict
+) -> np.ndarray:
+    """ Column of each player's NBA team in the schedule index,
+    -1 for players whose team has no games (e.g. free agents)
+
+    Players can also be given as their NBA team abbreviations,
+    e.g. PlayerPool.pro_teams """
+    pro_teams = [
+        str(getattr(player, 'proTeam', player)).upper() for player in players
+    ]
+    # Each NBA team is only looked up once
+    columns = {
+        pro_team: schedule.team_positions.get(team_id_name_mapping.get(pro_team), -1)
+        for pro_team in set(pro_teams)
+    }
+    return np.array([columns[pro_team] for pro_team in pro_teams], dtype=int)
+
+
+def project_league(
+    league: League,
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    teams: Optional[List[Team]] = None,
+    team_id_name_mapping: Optional[dict] = None, 
+    schedule: Optional[ScheduleIndex] = None,
+    include_dtdq=False,
+    include_o=False
+) -> np.ndarray:
+    """ Project categories for every team over every date range
+    
+    Computed as (games per player x per-game stats) summed over 
+    each fantasy team's roster, returning an array of shape 
+    (date_ranges, teams, AVG_STAT_COLS) """
+    if teams is None:
+        teams = league.teams
+    if team_id_name_mapping is None:
+        team_id_name_mapping = constants.get_team_name_mapping()
+    if schedule is None:
+        schedule = constants.get_schedule_index()
+        
+    all_players = [player for team in teams for player in team.roster]
+    player_stats = get_avg_stats_players(
+        all_players, include_dtdq=include_dtdq, include_o=include_o,
+        version=stats_version(league)
+    )[:, :len(constants.keep_keys)]
+    membership = np.zeros((len(teams), len(all_players)))
+    membership[
+        np.repeat(np.arange(len(teams)), [len(team.roster) for team in teams]),
+        np.arange(len(all_players))
+    ] = 1.0
+    
+    # Trailing column of zeros for players without a schedule
+    games = np.pad(schedule.num_games_many(date_ranges), ((0, 0), (0, 1)))
+    player_games = games[
+        :, get_schedule_columns(all_players, schedule, team_id_name_mapping)
+    ]
+    
+    totals = np.einsum(
+        'tp,wp,pk->wtk', membership, player_games, player_stats,
+        optimize=True
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fg_pct = (
+            totals[..., constants.keep_keys.index('FGM')] / 
+            totals[..., constants.keep_keys.index('FGA')]
+        )
+        ft_pct = (
+            totals[..., constants.keep_keys.index('FTM')] / 
+            totals[..., constants.keep_keys.index('FTA')]
+        )
+    
+    return np.concatenate(
+        [totals, fg_pct[..., np.newaxis], ft_pct[..., np.newaxis]], 
+        axis=-1
+    )
+
+
+@timed()
+def get_weekly_stats_league(
+    league: League,
+    start_date: datetime.datetime, 
+    end_date: datetime.datetime,
+    teams: Optional[List[Team]] = None,
+    team_id_name_mapping: Optional[dict] = None, 
+    schedule: Optional[ScheduleIndex] = None,
+    include_dtdq=False,
+    include_o=False
+) -> pd.DataFrame:
+    """ Get weekly stats for every team (or a subset of teams) 
+    in the league, same as get_weekly_stats_team for each team """
+    if teams is None:
+        teams = league.teams
+    projection = project_league(
+        league, [(start_date, end_date)], teams=teams,
+        team_id_name_mapping=team_id_name_mapping, schedule=schedule,
+        include_dtdq=include_dtdq, include_o=include_o
+    )
+    return pd.DataFrame(
+        projection[0],
+        index=pd.Index([team.team_name for team in teams], name="Name"),
+        columns=AVG_STAT_COLS
+    ).fillna(0.0)
+
+
+@timed()
+def get_weekly_stats_league_ranges(
+    league: League,
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    teams: Optional[List[Team]] = None,
+    team_id_name_mapping: Optional[dict] = None, 
+    schedule: Optional[ScheduleIndex] = None,
+    include_dtdq=False,
+    include_o=False
+) -> pd.DataFrame:
+    """ Get stats for every team over many date ranges 
+    (e.g. every remaining matchup week), indexed by 
+    (start_date, end_date, Name) """
+    if teams is None:
+        teams = league.teams
+    projection = project_league(
+        league, date_ranges, teams=teams,
+        team_id_name_mapping=team_id_name_mapping, schedule=schedule,
+        include_dtdq=include_dtdq, include_o=include_o
+    )
+    index = pd.MultiIndex.from_tuples(
+        [
+            (start_date, end_date, team.team_name)
+            for start_date, end_date in date_ranges
+            for team in teams
+        ],
+        names=["start_date", "end_date", "Name"]
+    )
+    return pd.DataFrame(
+        projection.reshape(-1, len(AVG_STAT_COLS)),
+        index=index,
+        columns=AVG_STAT_COLS
+    ).fillna(0.0)
+
+
+@timed()
+def build_league(
+    league_id: int,
+    year: int,
+    espn_s2: Optional[str] = None,
+    swid: Optional[str] = None,
+    cache: Optional[PayloadCache] = None,
+    client: Optional[FetchClient] = None
+) -> League:
+    """ Construct an espn_api League, serving ESPN responses 
+    from `cache` when they are still fresh 
+    
+    With a `client`, everything the League and pull_all_players need is
+    first fetched concurrently into the cache """
+    league = League(
+        league_id=league_id, year=year, espn_s2=espn_s2, swid=swid,
+        fetch_league=False
+    )
+    if cache is not None:
+        league.espn_request = CachedEspnRequests(
+            cache, sport='nba', year=year, league_id=league_id,
+            cookies=league.espn_request.cookies, logger=league.logger
+        )
+        if client is not None:
+            with span("espn_stats.build_league.prefetch"):
+                prefetch_league(client, cache, league.espn_request)
+    with span("espn_stats.build_league.fetch_league"):
+        league.fetch_league()
+    
+    return league
+
+
+def league_version(league: League) -> Tuple:
+    """ Hashable version of the ESPN payloads a League was built from,
+    changes when any of them is refetched. Uncached leagues get a new
+    version every time they are built """
+    if isinstance(league.espn_request, CachedEspnRequests):
+        version = league.espn_request.snapshot_version()
+    else:
+        version = id(league)
+    return (league.league_id, league.year, version)
+
+
+def stats_version(league: League) -> Optional[Tuple]:
+    """ Version to cache a League's player averages under, None (no
+    caching) unless its payloads come from a PayloadCache, the only
+    case where a version identifies the stats themselves """
+    if isinstance(league.espn_request, CachedEspnRequests):
+        return league_version(league)
+    return None
 
 
 def build_team_mapping(league: League):
@@ -269,63 +867,200 @@ def _is_out(player: Player):
     return (player.injuryStatus == 'OUT')
 
 
+class PlayerPool:
+    """ Per-game stats for a pool of players in one stat matrix, 
+    with rows indexed by ESPN player id and by name 
+    
+    Names are not unique in ESPN, a name maps to its first row;
+    use player ids to tell players with the same name apart """
+    def __init__(
+        self, 
+        names: List[str], 
+        stats: np.ndarray, 
+        player_ids: Optional[List[int]] = None,
+        pro_teams: Optional[List[str]] = None
+    ):
+        self.names = list(names)
+        self.stats = np.asarray(stats, dtype=np.float64)
+        self.player_ids = list(player_ids) if player_ids is not None else []
+        self.pro_teams = list(pro_teams) if pro_teams is not None else []
+        self.rows_by_id = {
+            player_id: i for i, player_id in enumerate(self.player_ids)
+        }
+        self.rows_by_name = {}
+        for i, name in enumerate(self.names):
+            self.rows_by_name.setdefault(name, i)
+            
+    @classmethod
+    def from_frame(cls, all_player_stats: pd.DataFrame) -> "PlayerPool":
+        """ From the output of pull_all_players """
+        return cls(
+            list(all_player_stats.index),
+            all_player_stats[AVG_STAT_COLS].to_numpy(),
+            player_ids=(
+                list(all_player_stats["playerId"]) 
+                if "playerId" in all_player_stats else None
+            ),
+            pro_teams=(
+                list(all_player_stats["proTeam"]) 
+                if "proTeam" in all_player_stats else None
+            ),
+        )
+    
+    def __len__(self):
+        return len(self.names)
+        
+    def row(self, player: Union[str, int]) -> int:
+        """ Row of a player, by ESPN player id or by name """
+        if isinstance(player, str):
+            return self.rows_by_name[player]
+        return self.rows_by_id[player]
+    
+    def name_of(self, player: Union[str, int]) -> str:
+        return self.names[self.row(player)]
+        
+        
+class TeamTotals:
+    """ Category totals for fantasy teams built from a PlayerPool, 
+    updated one player at a time rather than re-reducing rosters """
+    def __init__(self, pool: PlayerPool, team_names: List[str]):
+        self.pool = pool
+        self.team_names = list(team_names)
+        self.team_rows = {name: i for i, name in enumerate(self.team_names)}
+        self.totals = np.zeros((len(self.team_names), len(constants.keep_keys)))
+        self.rosters: Dict[str, List[int]] = {name: [] for name in self.team_names}
+        
+    def _add_row(self, team_name: str, row: int) -> None:
+        self.rosters[team_name].append(row)
+        self.totals[self.team_rows[team_name]] += (
+            self.pool.stats[row, :len(constants.keep_keys)]
+        )
+        
+    def _remove_row(self, team_name: str, row: int) -> None:
+        self.rosters[team_name].remove(row)
+        self.totals[self.team_rows[team_name]] -= (
+            self.pool.stats[row, :len(constants.keep_keys)]
+        )
+        if len(self.rosters[team_name]) == 0:
+            # Clear accumulated rounding error
+            self.totals[self.team_rows[team_name]] = 0.0
+        
+    def add(self, team_name: str, player: Union[str, int]) -> None:
+        self._add_row(team_name, self.pool.row(player))
+        
+    def remove(self, team_name: str, player: Union[str, int]) -> None:
+        self._remove_row(team_name, self.pool.row(player))
+        
+    def set_roster(self, team_name: str, players: List[Union[str, int]]) -> None:
+        """ Apply only the additions and removals since the last roster"""
+        stale_rows = list(self.rosters[team_name])
+        for row in [self.pool.row(player) for player in players]:
+            if row in stale_rows:
+                stale_rows.remove(row)
+            else:
+                self._add_row(team_name, row)
+        for row in stale_rows:
+            self._remove_row(team_name, row)
+        
+    def summary(self) -> pd.DataFrame:
+        """ Same table as summarize_league_draft"""
+        summary = pd.DataFrame(
+            self.totals, 
+            index=pd.Index(self.team_names, name="Name"),
+            columns=constants.keep_keys
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summary['FG%'] = summary['FGM'] / summary['FGA']
+            summary['FT%'] = summary['FTM'] / summary['FTA']
+        return summary.fillna(0.0)
+
+
+@timed()
 def summarize_league_draft(
     league: League, 
-    draft_rosters: Dict[str, List[str]], 
+    draft_rosters: Dict[str, List[Union[str, int]]], 
     include_dtdq=False,
-    include_o=False
+    include_o=False,
+    all_player_stats: Optional[pd.DataFrame] = None
 ):
-    """ Given a list of player names from a draft, summarize stats per team """
-    all_records = []
-    all_player_stats = pull_all_players(league)
-    for team_name, player_name_list in draft_rosters.items():
-        if len(player_name_list) > 0:
-            record = reduce_roster_stats_to_team(all_player_stats.loc[player_name_list])
-        else:
-            record = {key: 0.0 for key in constants.keep_keys}
-            record['FG%'] = 0.0
-            record['FT%'] = 0.0
-        record['Name'] = team_name
-        all_records.append(record)
-    return pd.DataFrame(all_records).set_index("Name").fillna(0.0)
+    """ Given a list of player names (or ESPN player ids) from a draft, 
+    summarize stats per team 
+    
+    `all_player_stats` defaults to pull_all_players(league) """
+    if all_player_stats is None:
+        all_player_stats = pull_all_players(league)
+    team_totals = TeamTotals(
+        PlayerPool.from_frame(all_player_stats), list(draft_rosters)
+    )
+    for team_name, players in draft_rosters.items():
+        team_totals.set_roster(team_name, players)
+    return team_totals.summary()
 
 
-@st.cache_data
 def pull_all_players(
-    _league, 
+    league: League, 
     week: int=None, 
     size: int=400, 
 ) -> pd.DataFrame:
     '''Returns a dataframe of all players and associated stats.
     By default, will include stats of DTD/Q/O players
+
+    Cached per league and league_version inside the app
     
     Adapted from https://github.com/cwendt94/espn-api/blob/1dda8f4c162fb80c1027987b1a5018b33db41cb6/espn_api/basketball/league.py#L115
     '''
+    return _pull_all_players(league, league_version(league), week=week, size=size)
 
-    if _league.year < 2019:
-        raise Exception('Cant use free agents before 2019')
-    if not week:
-        week = _league.current_week
 
-    params = {
-        'view': 'kona_player_info',
-        'scoringPeriodId': week,
-    }
-    filters = {
-        "players":{
-            "limit": size,
-            "sortPercOwned": {"sortPriority": 1, "sortAsc": False},
-            "sortDraftRanks": {
-                "sortPriority": 100, "sortAsc": True, "value": "STANDARD"
-            }
-        }
-    }
-    headers = {'x-fantasy-filter': json.dumps(filters)}
+@cache_data
+def _pull_all_players(
+    _league: League, 
+    version: Tuple, 
+    week: int=None, 
+    size: int=400
+) -> pd.DataFrame:
+    """ The League itself is not hashed, `version` (league id, year
+    and payload versions) identifies it in the cache key """
+    return get_pool_player_stats(_league, week=week, size=size)
 
-    data = _league.espn_request.league_get(params=params, headers=headers)
-    players = data['players']
-    all_players = [Player(payload, _league.year) for payload in players]
-    
-    all_players_stats = get_avg_stats_roster(all_players, include_dtdq=True, include_o=True)
+
+pull_all_players.clear = _pull_all_players.clear
+
+
+@timed()
+def get_pool_player_stats(
+    league: League, 
+    week: int=None, 
+    size: int=400, 
+) -> pd.DataFrame:
+    """ Uncached pull_all_players, for use outside of streamlit 
+    where one process serves many leagues """
+    all_players = fetch_pool_players(league, week=week, size=size)
+    version = stats_version(league)
+    all_players_stats = get_avg_stats_roster(
+        all_players, include_dtdq=True, include_o=True,
+        version=None if version is None else (*version, 'pool', week, size)
+    )
+    all_players_stats['playerId'] = [player.playerId for player in all_players]
+    all_players_stats['proTeam'] = [player.proTeam for player in all_players]
     
     return all_players_stats
+
+
+@timed()
+def fetch_pool_players(
+    league: League, 
+    week: int=None, 
+    size: int=400, 
+) -> List[Player]:
+    """ The `size` most owned players in the league """
+    if league.year < 2019:
+        raise Exception('Cant use free agents before 2019')
+    if not week:
+        week = league.current_week
+
+    request = player_pool_request(week, size=size)
+    data = league.espn_request.league_get(
+        params=request.params, headers=request.headers
+    )
+    return [Player(payload, league.year) for payload in data['players']]
@@ -0,0 +1,344 @@
+""" Per-player per-game box scores, ingested from ESPN scoring periods
+into a local Parquet dataset and summarized over arbitrary windows
+
+Each ESPN scoring period is one day of NBA games. The dataset is
+partitioned by season and scoring period, so a refresh only fetches and
+writes the periods completed since the last one. Once ingested, windows
+(date ranges, the last N days, exponentially weighted) are computed
+from memory for the whole player pool without network access. """
+import datetime
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from espn_api.basketball import League
+from espn_api.basketball.constant import PRO_TEAM_MAP, STATS_MAP
+
+import constants
+import espn_stats
+from espn_stats import AVG_STAT_COLS
+from espn_fetch import FetchClient, parse_pro_schedule, player_card_request
+
+GAMELOG_DIR = (
+    Path(os.environ.get("CATSKETBALL_CACHE_DIR", Path.home() / ".cache/catsketball"))
+    / "gamelogs"
+)
+# Box score columns kept for every game
+LOG_STATS = [*constants.keep_keys, 'MIN']
+_STAT_IDS = {name: stat_id for stat_id, name in STATS_MAP.items()}
+# ESPN stat splits holding one scoring period's actual stats
+_ACTUAL_SOURCE = 0
+_SINGLE_PERIOD_SPLIT = 5
+# Players per kona_playercard request
+PLAYER_BATCH_SIZE = 50
+
+
+def _log_schema():
+    """ Arrow schema of one stored scoring period """
+    import pyarrow as pa
+
+    return pa.schema([
+        ("playerId", pa.int64()),
+        ("name", pa.string()),
+        ("proTeam", pa.string()),
+        ("date", pa.date32()),
+        *[(stat, pa.float64()) for stat in LOG_STATS],
+    ])
+
+
+def period_dates(pro_schedule_payload: dict) -> Dict[int, datetime.date]:
+    """ US/Eastern date of every scoring period's games,
+    from one proTeamSchedules_wl payload """
+    timestamps = {
+        period: min(timestamp for _, timestamp in games.values())
+        for period, games in parse_pro_schedule(pro_schedule_payload).items()
+    }
+    dates = (
+        pd.to_datetime(list(timestamps.values()), unit='ms', utc=True)
+        .tz_convert('America/New_York').date
+    )
+    return dict(zip(timestamps, dates))
+
+
+def parse_game_logs(
+    payload: dict,
+    year: int,
+    periods: Iterable[int]
+) -> pd.DataFrame:
+    """ One row per player per game played in `periods`,
+    from a kona_playercard payload """
+    periods = set(periods)
+    rows = []
+    for entry in payload.get('players', []):
+        player = entry.get('player', entry)
+        for split in player.get('stats', []):
+            if (
+                (split.get('seasonId') != year) or
+                (split.get('statSourceId') != _ACTUAL_SOURCE) or
+                (split.get('statSplitTypeId') != _SINGLE_PERIOD_SPLIT) or
+                (split.get('scoringPeriodId') not in periods)
+            ):
+                continue
+            stats = split.get('stats') or {}
+            # Games the player sat out come back with zero minutes
+            if stats.get(_STAT_IDS['MIN'], 0) <= 0:
+                continue
+            rows.append([
+                player['id'],
+                player.get('fullName'),
+                PRO_TEAM_MAP.get(player.get('proTeamId'), 'FA'),
+                split['scoringPeriodId'],
+                *[float(stats.get(_STAT_IDS[stat], 0.0)) for stat in LOG_STATS]
+            ])
+    return pd.DataFrame(
+        rows,
+        columns=["playerId", "name", "proTeam", "scoringPeriodId", *LOG_STATS]
+    ).astype({"playerId": np.int64, "scoringPeriodId": np.int64})
+
+
+class GameLogs(NamedTuple):
+    """ Every ingested game of one season, as arrays
+
+    Rows are grouped by player (in player_ids order) and every player
+    has at least one game """
+    player_ids: np.ndarray  # (players,)
+    names: List[str]  # (players,) latest name of each player
+    pro_teams: List[str]  # (players,) latest NBA team of each player
+    player_rows: np.ndarray  # (games,) index into player_ids
+    dates: np.ndarray  # (games,) datetime64[D]
+    stats: np.ndarray  # (games, LOG_STATS)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def player_starts(self) -> np.ndarray:
+        """ First row of each player's games """
+        return np.flatnonzero(
+            np.r_[True, self.player_rows[1:] != self.player_rows[:-1]]
+        )
+
+    def window_stats(
+        self,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        weights: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ Per-game averages of every player over
+        start_date <= date < end_date, optionally weighting each game
+
+        Returns (players, [*AVG_STAT_COLS, 'MIN']) averages, with FG% and
+        FT% from the averaged makes and attempts, and (players,) games
+        in the window. Players without a game in it are all zeros """
+        in_window = np.ones(len(self), dtype=bool)
+        if start_date is not None:
+            in_window &= self.dates >= np.datetime64(start_date, 'D')
+        if end_date is not None:
+            in_window &= self.dates < np.datetime64(end_date, 'D')
+        weights = (
+            in_window.astype(np.float64) if weights is None
+            else np.where(in_window, weights, 0.0)
+        )
+        if len(self) == 0:
+            return np.zeros((0, len(AVG_STAT_COLS) + 1)), np.zeros(0, dtype=int)
+        # Rows are grouped by player, so each player's sums are one
+        # segment of a single reduceat over the whole log
+        starts = self.player_starts()
+        weight_sums = np.add.reduceat(weights, starts)
+        sums = np.add.reduceat(weights[:, np.newaxis] * self.stats, starts, axis=0)
+        games = np.add.reduceat(in_window.astype(int), starts)
+        means = np.divide(
+            sums, weight_sums[:, np.newaxis],
+            out=np.zeros_like(sums), where=weight_sums[:, np.newaxis] > 0
+        )
+        fgm, fga, ftm, fta = (
+            means[:, LOG_STATS.index(k)] for k in ['FGM', 'FGA', 'FTM', 'FTA']
+        )
+        fg_pct = np.divide(fgm, fga, out=np.zeros_like(fgm), where=fga != 0)
+        ft_pct = np.divide(ftm, fta, out=np.zeros_like(ftm), where=fta != 0)
+
+        return (
+            np.column_stack([
+                means[:, :len(constants.keep_keys)], fg_pct, ft_pct,
+                means[:, LOG_STATS.index('MIN')]
+            ]),
+            games
+        )
+
+    def window(
+        self,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        weights: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """ window_stats as a frame shaped like pull_all_players
+        (AVG_STAT_COLS, MIN, GP, playerId, proTeam), so it can
+        back a PlayerPool """
+        averages, games = self.window_stats(start_date, end_date, weights)
+        columns = {
+            col: averages[:, i] for i, col in enumerate([*AVG_STAT_COLS, 'MIN'])
+        }
+        return pd.DataFrame(
+            {
+                **columns,
+                'GP': games,
+                'playerId': self.player_ids,
+                'proTeam': self.pro_teams,
+            },
+            index=pd.Index(self.names, name="Name")
+        )
+
+    def last_days(
+        self,
+        days: int,
+        as_of: Optional[datetime.date] = None
+    ) -> pd.DataFrame:
+        """ Averages over the `days` days before `as_of`
+        (default the day after the last ingested game) """
+        as_of = self._as_of(as_of)
+        return self.window(as_of - np.timedelta64(days, 'D'), as_of)
+
+    def ewm(
+        self,
+        halflife_days: float,
+        as_of: Optional[datetime.date] = None
+    ) -> pd.DataFrame:
+        """ Exponentially weighted averages, a game `halflife_days`
+        before `as_of` counts half as much as one on `as_of` """
+        as_of = self._as_of(as_of)
+        age = (as_of - self.dates).astype(np.float64)
+        return self.window(end_date=as_of, weights=0.5 ** (age / halflife_days))
+
+    def _as_of(self, as_of: Optional[datetime.date]) -> np.datetime64:
+        if as_of is not None:
+            return np.datetime64(as_of, 'D')
+        if len(self) == 0:
+            return np.datetime64(datetime.date.today(), 'D')
+        return self.dates.max() + np.timedelta64(1, 'D')
+
+
+class GameLogStore:
+    """ Hive-partitioned Parquet dataset of game logs,
+    <root>/year=<year>/scoringPeriodId=<period>/ """
+    def __init__(self, root: Path = GAMELOG_DIR):
+        self.root = Path(root)
+
+    def periods(self, year: int) -> List[int]:
+        """ Scoring periods already ingested for a season"""
+        season_dir = self.root / f"year={year}"
+        if not season_dir.exists():
+            return []
+        return sorted(
+            int(path.name.split("=", 1)[1])
+            for path in season_dir.glob("scoringPeriodId=*")
+        )
+
+    def write(self, year: int, logs: pd.DataFrame, periods: Iterable[int]) -> None:
+        """ Replace the given periods of a season with `logs`,
+        periods without any game are still recorded as ingested """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _log_schema()
+        for period in periods:
+            period_dir = self.root / f"year={year}" / f"scoringPeriodId={period}"
+            period_dir.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(
+                logs.loc[logs["scoringPeriodId"] == period, schema.names],
+                schema=schema, preserve_index=False
+            )
+            # Write then rename, so readers never see a partial file
+            tmp_path = period_dir / "part-0.parquet.tmp"
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, period_dir / "part-0.parquet")
+
+    def read_frame(self, year: int) -> pd.DataFrame:
+        """ Every ingested game of a season, by player then period """
+        import pyarrow.dataset as ds
+
+        season_dir = self.root / f"year={year}"
+        columns = ["playerId", "name", "proTeam", "scoringPeriodId", "date", *LOG_STATS]
+        if not season_dir.exists():
+            return pd.DataFrame(columns=columns)
+        table = ds.dataset(
+            season_dir, format="parquet", partitioning="hive"
+        ).to_table()
+        if table.num_rows == 0:
+            return pd.DataFrame(columns=columns)
+        return (
+            table.to_pandas()
+            .astype({"scoringPeriodId": np.int64})
+            .sort_values(["playerId", "scoringPeriodId"], kind="stable")
+            .reset_index(drop=True)
+        )[columns]
+
+    def read(self, year: int) -> GameLogs:
+        df = self.read_frame(year)
+        all_ids = df["playerId"].to_numpy(dtype=np.int64)
+        player_ids, player_rows = np.unique(all_ids, return_inverse=True)
+        # Names and NBA teams as of each player's latest game
+        last_rows = len(df) - 1 - np.unique(all_ids[::-1], return_index=True)[1]
+        return GameLogs(
+            player_ids=player_ids,
+            names=list(df["name"].to_numpy()[last_rows]),
+            pro_teams=list(df["proTeam"].to_numpy()[last_rows]),
+            player_rows=player_rows.reshape(-1),
+            dates=pd.to_datetime(df["date"]).to_numpy().astype('datetime64[D]'),
+            stats=df[LOG_STATS].to_numpy(dtype=np.float64)
+        )
+
+    def ingest(
+        self,
+        league: League,
+        player_ids: Optional[Iterable[int]] = None,
+        client: Optional[FetchClient] = None
+    ) -> int:
+        """ Fetch and store the scoring periods completed since the
+        last ingested one, returns the number of games added
+
+        `player_ids` defaults to the league's player pool and rosters.
+        Players added to that set later only get games from then on """
+        year = league.year
+        # Today's period is still being played
+        last_complete = min(league.scoringPeriodId - 1, league.finalScoringPeriod)
+        ingested = self.periods(year)
+        first_new = (max(ingested) + 1) if ingested else 1
+        new_periods = list(range(first_new, last_complete + 1))
+        if len(new_periods) == 0:
+            return 0
+
+        if player_ids is None:
+            player_ids = {
+                player.playerId
+                for player in espn_stats.fetch_pool_players(league)
+            } | {
+                player.playerId for team in league.teams for player in team.roster
+            }
+        player_ids = sorted(set(player_ids))
+        requests_to_fetch = [
+            player_card_request(
+                player_ids[i:i + PLAYER_BATCH_SIZE],
+                scoring_period=last_complete,
+                n_periods=len(new_periods)
+            )
+            for i in range(0, len(player_ids), PLAYER_BATCH_SIZE)
+        ]
+        if client is not None:
+            payloads = client.fetch_many(league.espn_request, requests_to_fetch)
+        else:
+            payloads = [
+                league.espn_request.league_get(
+                    params=request.params, headers=request.headers
+                )
+                for request in requests_to_fetch
+            ]
+
+        logs = pd.concat(
+            [parse_game_logs(payload, year, new_periods) for payload in payloads],
+            ignore_index=True
+        ).drop_duplicates(["playerId", "scoringPeriodId"])
+        dates = period_dates(league.espn_request.get_pro_schedule())
+        logs["date"] = logs["scoringPeriodId"].map(dates)
+        self.write(year, logs, new_periods)
+        return len(logs)
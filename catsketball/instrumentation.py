@@ -0,0 +1,247 @@
+""" Timing spans and counters for the app's hot paths
+
+Disabled by default; set CATSKETBALL_INSTRUMENT=1 (or call enable()).
+While disabled, span() hands back one shared no-op context manager and
+timed() functions cost a single flag check, so instrumented code can
+stay instrumented in production.
+
+Every span and counter is recorded twice: into the process-wide
+registry (totals and recent durations for p50/p95, exported as JSON or
+Prometheus text) and into the current rerun, if one was started with
+start_rerun(), for the app's debug panel. Set CATSKETBALL_METRICS_FILE
+to also write the Prometheus text at the end of every rerun, e.g. for
+node_exporter's textfile collector. """
+from collections import deque
+import contextlib
+import contextvars
+import functools
+import json
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional
+import warnings
+
+# Durations kept per span for percentiles
+WINDOW_SIZE = 2048
+QUANTILES = (0.5, 0.95)
+
+_enabled = os.environ.get("CATSKETBALL_INSTRUMENT", "").lower() in ("1", "true", "yes")
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+class SpanStats:
+    """ Call count, total time and the most recent durations of one span"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent: Deque[float] = deque(maxlen=WINDOW_SIZE)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        import numpy as np
+
+        if len(self.recent) == 0:
+            return {q: 0.0 for q in QUANTILES}
+        values = np.quantile(np.fromiter(self.recent, dtype=np.float64), QUANTILES)
+        return dict(zip(QUANTILES, values))
+
+
+class Recorder:
+    """ Spans and counters, safe to record into from many threads """
+    def __init__(self):
+        self.spans: Dict[str, SpanStats] = {}
+        self.counters: Dict[str, float] = {}
+        self.started = 0.0
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(seconds)
+
+    def add_count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        """ Plain-data copy: per span count, total and quantiles
+        (milliseconds), and every counter """
+        with self._lock:
+            spans = {
+                name: {
+                    "count": stats.count,
+                    "total_ms": stats.total * 1e3,
+                    **{
+                        f"p{int(q * 100)}_ms": value * 1e3
+                        for q, value in stats.quantiles().items()
+                    },
+                }
+                for name, stats in sorted(self.spans.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+        return {"spans": spans, "counters": counters}
+
+
+registry = Recorder()
+_current_rerun: contextvars.ContextVar[Optional[Recorder]] = contextvars.ContextVar(
+    "catsketball_rerun", default=None
+)
+
+
+def _record_span(name: str, seconds: float) -> None:
+    registry.add_span(name, seconds)
+    rerun = _current_rerun.get()
+    if rerun is not None:
+        rerun.add_span(name, seconds)
+
+
+@contextlib.contextmanager
+def _span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_span(name, time.perf_counter() - start)
+
+
+def span(name: str):
+    """ Context manager timing its block, a shared no-op when disabled """
+    if not _enabled:
+        return _NULL_SPAN
+    return _span(name)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """ Decorator timing every call, named module.qualname by default """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record_span(span_name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count(name: str, n: float = 1) -> None:
+    """ Add to a counter, e.g. ESPN requests or cache hits """
+    if not _enabled:
+        return
+    registry.add_count(name, n)
+    rerun = _current_rerun.get()
+    if rerun is not None:
+        rerun.add_count(name, n)
+
+
+def start_rerun() -> Optional[Recorder]:
+    """ Record spans and counters of this thread's work (and of work it
+    submits with contextvars copied) into a fresh Recorder """
+    if not _enabled:
+        return None
+    rerun = Recorder()
+    rerun.started = time.perf_counter()
+    _current_rerun.set(rerun)
+    return rerun
+
+
+def end_rerun(rerun: Optional[Recorder]) -> None:
+    """ Record the rerun's wall time as the `rerun` span and stop
+    recording into it """
+    if rerun is None:
+        return
+    _record_span("rerun", time.perf_counter() - rerun.started)
+    _current_rerun.set(None)
+    path = os.environ.get("CATSKETBALL_METRICS_FILE")
+    if path:
+        # Metrics are best effort, never fail the user's rerun
+        try:
+            write_prometheus(Path(path))
+        except OSError as e:
+            warnings.warn(f"Could not write metrics to {path}: {e}")
+
+
+def to_json(recorder: Optional[Recorder] = None) -> str:
+    return json.dumps((recorder or registry).snapshot(), indent=2)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _counter_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus(recorder: Optional[Recorder] = None) -> str:
+    """ Prometheus text exposition: one summary for all spans
+    (labelled by span) and one counter per counter name """
+    snapshot = (recorder or registry).snapshot()
+    lines = [
+        "# HELP catsketball_span_seconds Wall time of instrumented code",
+        "# TYPE catsketball_span_seconds summary",
+    ]
+    for name, stats in snapshot["spans"].items():
+        label = f'span="{_label(name)}"'
+        for q in QUANTILES:
+            value = stats[f"p{int(q * 100)}_ms"] / 1e3
+            lines.append(f'catsketball_span_seconds{{{label},quantile="{q}"}} {value:.6g}')
+        lines.append(f"catsketball_span_seconds_sum{{{label}}} {stats['total_ms'] / 1e3:.6g}")
+        lines.append(f"catsketball_span_seconds_count{{{label}}} {stats['count']}")
+    for name, value in snapshot["counters"].items():
+        metric = f"catsketball_{_counter_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: Path) -> None:
+    """ Write the registry's Prometheus text, replacing `path` atomically
+
+    Every writer gets its own temporary file, so concurrent reruns
+    never rename each other's half-written output """
+    path = Path(path)
+    with tempfile.NamedTemporaryFile(
+        'w', dir=path.parent, prefix=f".{path.name}.", suffix=".tmp",
+        delete=False
+    ) as f:
+        f.write(to_prometheus())
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+def span_table(recorder: Recorder) -> List[dict]:
+    """ Rows of a recorder's spans, slowest total first, for display """
+    snapshot = recorder.snapshot()
+    return sorted(
+        (
+            {"span": name, **stats}
+            for name, stats in snapshot["spans"].items()
+        ),
+        key=lambda row: row["total_ms"], reverse=True
+    )
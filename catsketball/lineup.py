@@ -0,0 +1,198 @@
+import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from espn_api.basketball import League, Team
+
+import constants
+import espn_stats
+from schedule import ScheduleIndex
+from valuation import category_values, standardize_values
+
+# ESPN's default H2H starting lineup, 10 starters
+DEFAULT_SLOT_COUNTS = {
+    'PG': 1, 'SG': 1, 'SF': 1, 'PF': 1, 'C': 1, 'G': 1, 'F': 1, 'UT': 3,
+}
+# Any eligible starter beats an empty slot, whatever the values
+_STARTER_BONUS = 1e6
+
+
+class LineupPlan(NamedTuple):
+    """ Best starting lineup of one fantasy team for each game day """
+    team_name: str
+    player_names: List[str]
+    days: np.ndarray  # (days,) datetime64[D]
+    slots: List[str]  # one entry per starting slot
+    # (days, players) index into `slots` each player starts in, -1 if benched
+    assignments: np.ndarray
+    games: np.ndarray  # (days, players) games started
+
+    def lineup_frame(self) -> pd.DataFrame:
+        """ Slot of every player on every day, empty if not starting """
+        slot_names = np.array([*self.slots, ''], dtype=object)
+        return pd.DataFrame(
+            slot_names[self.assignments].T,
+            index=pd.Index(self.player_names, name="Name"),
+            columns=[str(day) for day in self.days]
+        )
+
+
+def expand_slots(slot_counts: Dict[str, int]) -> List[str]:
+    return [slot for slot, count in slot_counts.items() for _ in range(count)]
+
+
+def get_eligibility(players: List, slots: List[str]) -> np.ndarray:
+    """ (players, slots) whether each player may start in each slot"""
+    return np.array([
+        [slot in player.eligibleSlots for slot in slots]
+        for player in players
+    ], dtype=bool).reshape(len(players), len(slots))
+
+
+def player_values(per_game: np.ndarray, active: np.ndarray) -> np.ndarray:
+    """ One number per player to rank starters by, the sum of per-game
+    category z-scores against the active players """
+    values = category_values(per_game, active)
+    return standardize_values(values, active).sum(axis=-1)
+
+
+def solve_lineup(
+    playing: np.ndarray,
+    eligibility: np.ndarray,
+    values: np.ndarray
+) -> np.ndarray:
+    """ Assign the players with a game to starting slots, maximizing
+    the number of starters and then their total value
+
+    Returns the slot each player starts in, -1 if benched """
+    from scipy.optimize import linear_sum_assignment
+
+    assignment = np.full(len(playing), -1, dtype=int)
+    candidates = np.flatnonzero(playing & eligibility.any(axis=1))
+    if len(candidates) == 0:
+        return assignment
+    allowed = eligibility[candidates]
+    weights = np.where(
+        allowed, _STARTER_BONUS + values[candidates, np.newaxis], 0.0
+    )
+    rows, cols = linear_sum_assignment(weights, maximize=True)
+    starts = allowed[rows, cols]
+    assignment[candidates[rows[starts]]] = cols[starts]
+
+    return assignment
+
+
+def optimize_lineups(
+    team: Team,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    slot_counts: Optional[Dict[str, int]] = None,
+    per_game: Optional[np.ndarray] = None,
+    values: Optional[np.ndarray] = None,
+    team_id_name_mapping: Optional[dict] = None,
+    schedule: Optional[ScheduleIndex] = None,
+    include_dtdq=False,
+    include_o=False
+) -> LineupPlan:
+    """ Best daily lineups for a fantasy team over start_date <= date < end_date
+
+    Days with the same players in action share one lineup, so each
+    distinct set of available players is only solved once. `per_game`
+    (players, AVG_STAT_COLS) and `values` (players,) default to the
+    roster's own averages, pass them to value players against the league """
+    if slot_counts is None:
+        slot_counts = DEFAULT_SLOT_COUNTS
+    if team_id_name_mapping is None:
+        team_id_name_mapping = constants.get_team_name_mapping()
+    if schedule is None:
+        schedule = constants.get_schedule_index()
+    players = team.roster
+    if per_game is None:
+        per_game = espn_stats.get_avg_stats_players(
+            players, include_dtdq=include_dtdq, include_o=include_o
+        )
+    active = per_game[:, :len(constants.keep_keys)].any(axis=1)
+    if values is None:
+        values = player_values(per_game, active)
+    slots = expand_slots(slot_counts)
+    eligibility = get_eligibility(players, slots)
+
+    days, team_games = schedule.daily_games(start_date, end_date)
+    # Trailing column of zeros for players without a schedule
+    team_games = np.pad(team_games, ((0, 0), (0, 1)))
+    games = team_games[
+        :, espn_stats.get_schedule_columns(players, schedule, team_id_name_mapping)
+    ]
+    playing = (games > 0) & active
+
+    assignments = np.full(playing.shape, -1, dtype=int)
+    patterns, pattern_days = np.unique(playing, axis=0, return_inverse=True)
+    for i, pattern in enumerate(patterns):
+        assignments[pattern_days.reshape(-1) == i] = solve_lineup(
+            pattern, eligibility, values
+        )
+
+    return LineupPlan(
+        team_name=team.team_name,
+        player_names=[player.name for player in players],
+        days=days,
+        slots=slots,
+        assignments=assignments,
+        games=np.where(assignments >= 0, games, 0.0)
+    )
+
+
+def get_weekly_stats_league_lineups(
+    league: League,
+    start_date: datetime.datetime,
+    end_date: datetime.datetime,
+    teams: Optional[List[Team]] = None,
+    slot_counts: Optional[Dict[str, int]] = None,
+    team_id_name_mapping: Optional[dict] = None,
+    schedule: Optional[ScheduleIndex] = None,
+    include_dtdq=False,
+    include_o=False
+) -> pd.DataFrame:
+    """ Same table as get_weekly_stats_league, counting only the games
+    of players in each day's best starting lineup
+
+    Players are valued against every rostered player in `teams` """
+    if teams is None:
+        teams = league.teams
+    if team_id_name_mapping is None:
+        team_id_name_mapping = constants.get_team_name_mapping()
+    if schedule is None:
+        schedule = constants.get_schedule_index()
+
+    all_players = [player for team in teams for player in team.roster]
+    per_game = espn_stats.get_avg_stats_players(
+        all_players, include_dtdq=include_dtdq, include_o=include_o,
+        version=espn_stats.stats_version(league)
+    )
+    values = player_values(
+        per_game, per_game[:, :len(constants.keep_keys)].any(axis=1)
+    )
+    offsets = np.cumsum([0, *[len(team.roster) for team in teams]])
+
+    totals = np.zeros((len(teams), len(constants.keep_keys)))
+    for i, team in enumerate(teams):
+        roster = slice(offsets[i], offsets[i + 1])
+        plan = optimize_lineups(
+            team, start_date, end_date, slot_counts=slot_counts,
+            per_game=per_game[roster], values=values[roster],
+            team_id_name_mapping=team_id_name_mapping, schedule=schedule
+        )
+        totals[i] = (
+            plan.games.sum(axis=0) @ per_game[roster, :len(constants.keep_keys)]
+        )
+
+    summary = pd.DataFrame(
+        totals,
+        index=pd.Index([team.team_name for team in teams], name="Name"),
+        columns=constants.keep_keys
+    )
+    summary['FG%'] = summary['FGM'] / summary['FGA']
+    summary['FT%'] = summary['FTM'] / summary['FTA']
+
+    return summary.fillna(0.0)
@@ -0,0 +1,42 @@
+""" Memoized computations of the app's sections
+
+Each section's result is a node, cached under a key made of exactly the
+inputs it reads (league version, injury flags, selected teams, dates,
+...), so a rerun only recomputes the sections whose inputs changed.
+Every node keeps its `maxsize` most recently used results. """
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from instrumentation import count, span
+
+
+class MemoCache:
+    """ Per-node LRU of computed results, one per session"""
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self.nodes: Dict[str, OrderedDict] = {}
+
+    def get(self, node: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """ Cached result of `node` for `key`, calling `compute` on a miss"""
+        entries = self.nodes.setdefault(node, OrderedDict())
+        if key in entries:
+            entries.move_to_end(key)
+            count("memo.hits")
+            return entries[key]
+        count("memo.misses")
+        with span(f"memo.{node}"):
+            value = compute()
+        entries[key] = value
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
+
+    def invalidate(self, node: Optional[str] = None) -> None:
+        """ Drop one node's results, or every node's """
+        if node is None:
+            self.nodes.clear()
+        else:
+            self.nodes.pop(node, None)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.nodes.values())
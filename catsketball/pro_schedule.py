@@ -0,0 +1,249 @@
+""" Refresh the NBA schedule and team id mapping from ESPN
+
+    python catsketball/pro_schedule.py --year 2025
+
+The schedule is stored in staticdata/nba_schedule.npz as a days x teams
+uint8 matrix of games, one row per day with games (US/Eastern dates).
+ESPN serves the whole season's schedule in one proTeamSchedules_wl
+payload, so a refresh is a single request (served from the payload
+cache while fresh); only the days whose games changed, e.g.
+postponements, are reported, and the files are only rewritten if
+something changed. """
+import argparse
+import os
+from pathlib import Path
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from schedule import ScheduleIndex
+
+STATICDATA_DIR = Path(__file__).parent / "staticdata"
+SCHEDULE_PATH = STATICDATA_DIR / "nba_schedule.npz"
+TEAM_MAPPING_PATH = STATICDATA_DIR / "team_id_mappings.yaml"
+
+
+class ProSchedule(NamedTuple):
+    """ Games of every NBA team on every day with games """
+    days: np.ndarray  # (days,) datetime64[D], sorted
+    team_ids: np.ndarray  # (teams,) ESPN pro team ids, sorted
+    games: np.ndarray  # (days, teams) uint8
+
+    def frame(self) -> pd.DataFrame:
+        """ Same layout as the old nba_schedule.csv,
+        dates x str(team id) floats """
+        return pd.DataFrame(
+            self.games.astype(np.float64),
+            index=pd.DatetimeIndex(self.days.astype('datetime64[ns]')),
+            columns=[str(team_id) for team_id in self.team_ids]
+        )
+
+    def to_index(self) -> ScheduleIndex:
+        cumulative = np.zeros(
+            (len(self.days) + 1, len(self.team_ids)), dtype=np.float64
+        )
+        np.cumsum(self.games, axis=0, out=cumulative[1:])
+        return ScheduleIndex.from_arrays(
+            self.days.astype('datetime64[ns]'), self.team_ids, cumulative
+        )
+
+    def games_on(self, days: np.ndarray, team_ids: np.ndarray) -> np.ndarray:
+        """ (days, team_ids) games, zero for days or teams not scheduled"""
+        out = np.zeros((len(days), len(team_ids)), dtype=np.uint8)
+        rows = np.searchsorted(self.days, days)
+        rows_found = (rows < len(self.days))
+        rows_found[rows_found] &= self.days[rows[rows_found]] == days[rows_found]
+        cols = np.searchsorted(self.team_ids, team_ids)
+        cols_found = (cols < len(self.team_ids))
+        cols_found[cols_found] &= self.team_ids[cols[cols_found]] == team_ids[cols_found]
+        out[np.ix_(rows_found, cols_found)] = self.games[
+            np.ix_(rows[rows_found], cols[cols_found])
+        ]
+        return out
+
+
+def from_games(days: np.ndarray, team_ids: np.ndarray) -> ProSchedule:
+    """ Build a ProSchedule from one (day, team id) pair per game """
+    all_days, day_rows = np.unique(days.astype('datetime64[D]'), return_inverse=True)
+    all_teams, team_cols = np.unique(np.asarray(team_ids, dtype=np.int64), return_inverse=True)
+    games = np.zeros((len(all_days), len(all_teams)), dtype=np.uint8)
+    np.add.at(games, (day_rows.reshape(-1), team_cols.reshape(-1)), 1)
+    return ProSchedule(days=all_days, team_ids=all_teams, games=games)
+
+
+def from_frame(schedule: pd.DataFrame) -> ProSchedule:
+    """ Convert a dates x team id schedule table (the old CSV format),
+    games on the same calendar day are added together """
+    dates, cols = np.nonzero(schedule.fillna(0.0).to_numpy() > 0)
+    counts = schedule.fillna(0.0).to_numpy()[dates, cols].astype(int)
+    return from_games(
+        np.repeat(schedule.index.values[dates], counts),
+        np.repeat(np.array([int(col) for col in schedule.columns])[cols], counts)
+    )
+
+
+def parse_schedule(payload: dict) -> ProSchedule:
+    """ Schedule of every team from one proTeamSchedules_wl payload """
+    from espn_fetch import parse_pro_schedule
+
+    team_ids, timestamps = [], []
+    for games in parse_pro_schedule(payload).values():
+        for team_id, (_, timestamp) in games.items():
+            team_ids.append(team_id)
+            timestamps.append(timestamp)
+    days = (
+        pd.to_datetime(timestamps, unit='ms', utc=True)
+        .tz_convert('America/New_York').tz_localize(None)
+        .to_numpy().astype('datetime64[D]')
+    )
+    return from_games(days, np.array(team_ids, dtype=np.int64))
+
+
+def build_team_mapping(payload: dict) -> Dict:
+    """ ESPN pro team id <-> abbreviation, both ways
+
+    Abbreviations are the ones espn_api gives players (`proTeam`), which
+    differ from the payload's for some teams (e.g. NYK rather than NY) """
+    from espn_api.basketball.constant import PRO_TEAM_MAP
+
+    mapping = {}
+    for team in payload.get('settings', {}).get('proTeams', []):
+        abbrev = PRO_TEAM_MAP.get(team['id'], team['abbrev']).upper()
+        mapping[team['id']] = abbrev
+        mapping[abbrev] = team['id']
+    return dict(sorted(mapping.items(), key=lambda x: str(x[0])))
+
+
+def changed_days(old: ProSchedule, new: ProSchedule) -> np.ndarray:
+    """ Days on which any team's games differ between two schedules"""
+    days = np.union1d(old.days, new.days)
+    team_ids = np.union1d(old.team_ids, new.team_ids)
+    diff = old.games_on(days, team_ids) != new.games_on(days, team_ids)
+    return days[diff.any(axis=1)]
+
+
+def load_schedule(path: Path = SCHEDULE_PATH) -> ProSchedule:
+    with np.load(path, allow_pickle=False) as data:
+        return ProSchedule(
+            days=data["days"], team_ids=data["team_ids"], games=data["games"]
+        )
+
+
+def save_schedule(schedule: ProSchedule, path: Path = SCHEDULE_PATH) -> None:
+    # Write then rename, so readers never see a partial file
+    tmp_path = Path(path).with_suffix(".tmp.npz")
+    np.savez(tmp_path, **schedule._asdict())
+    os.replace(tmp_path, path)
+
+
+def save_team_mapping(mapping: Dict, path: Path = TEAM_MAPPING_PATH) -> None:
+    import yaml
+
+    tmp_path = Path(path).with_suffix(".tmp.yaml")
+    with open(tmp_path, 'w') as f:
+        f.write(yaml.dump(mapping))
+    os.replace(tmp_path, path)
+
+
+def fetch_schedule_payload(year: int, cache=None) -> dict:
+    """ proTeamSchedules_wl for a season, served from `cache`
+    (a PayloadCache) while it is fresh. Needs no league or cookies """
+    from espn_api.requests.espn_requests import EspnFantasyRequests
+    from espn_cache import CachedEspnRequests
+
+    if cache is None:
+        espn_request = EspnFantasyRequests(sport='nba', year=year, league_id=None)
+    else:
+        espn_request = CachedEspnRequests(
+            cache, sport='nba', year=year, league_id=None
+        )
+    return espn_request.get_pro_schedule()
+
+
+def refresh_schedule(
+    year: int,
+    path: Path = SCHEDULE_PATH,
+    mapping_path: Path = TEAM_MAPPING_PATH,
+    cache=None,
+    payload: Optional[dict] = None
+) -> np.ndarray:
+    """ Update the stored schedule and team mapping from ESPN,
+    returns the days whose games were added or changed. This process's
+    copies in constants are dropped if either file is rewritten """
+    if payload is None:
+        payload = fetch_schedule_payload(year, cache=cache)
+    new = parse_schedule(payload)
+    if Path(path).exists():
+        days = changed_days(load_schedule(path), new)
+    else:
+        days = new.days
+    changed = len(days) > 0
+    if changed:
+        save_schedule(new, path)
+
+    mapping = build_team_mapping(payload)
+    if mapping and not _same_mapping(mapping_path, mapping):
+        save_team_mapping(mapping, mapping_path)
+        changed = True
+    if changed:
+        import constants
+        constants.clear_static_data()
+    return days
+
+
+def _same_mapping(path: Path, mapping: Dict) -> bool:
+    import yaml
+
+    if not Path(path).exists():
+        return False
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) == mapping
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:])
+    )
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--output", type=Path, default=SCHEDULE_PATH)
+    parser.add_argument("--team-mapping", type=Path, default=TEAM_MAPPING_PATH)
+    parser.add_argument(
+        "--from-csv", type=Path,
+        help="convert an old dates x team id schedule CSV instead of fetching"
+    )
+    parser.add_argument("--no-cache", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.from_csv is not None:
+        save_schedule(
+            from_frame(pd.read_csv(args.from_csv, index_col=0, parse_dates=True)),
+            args.output
+        )
+        print(args.output)
+        return 0
+
+    from espn_cache import PayloadCache
+
+    days = refresh_schedule(
+        args.year, path=args.output, mapping_path=args.team_mapping,
+        cache=None if args.no_cache else PayloadCache()
+    )
+    if len(days) == 0:
+        print("Schedule unchanged")
+    else:
+        print(
+            f"{len(days)} days changed ({days.min()} to {days.max()}), "
+            f"wrote {args.output}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+import os
+from pathlib import Path
+import threading
+import warnings
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+STATICDATA_DIR = Path(__file__).parent / "staticdata"
+SNAPSHOT_DIR = (
+    Path(os.environ.get("CATSKETBALL_CACHE_DIR", Path.home() / ".cache/catsketball"))
+    / "projections"
+)
+STAT_COLS = ["FG%", "FT%", "3PM", "PTS", "TREB", "AST", "STL", "BLK", "TO"]
+# Every source is normalized to these columns, percentages in 0-100
+PROJECTION_COLS = [
+    "PLAYER", "RNK", "Value", "drafted_by", "POS", "TEAM", "GP",
+    *STAT_COLS, "MPG", "FGM", "FGA", "FTM", "FTA",
+]
+
+
+class ProjectionSource(NamedTuple):
+    name: str
+    load: Callable[[], pd.DataFrame]
+    remote: bool = False
+    fallback: Optional[str] = None
+
+
+def _read_fanscout() -> pd.DataFrame:
+    return (
+        pd.read_html("https://fanscout.pro/projections")[0]
+        .rename(columns={
+            "Name": "PLAYER",
+            "G": "GP",
+            "M": "MPG",
+            "TPM": "3PM",
+            "REB": "TREB",
+            "TOV": "TO"
+        })
+        .assign(POS=None)
+    )
+
+
+def _read_nba_projections_full() -> pd.DataFrame:
+    return pd.read_csv(STATICDATA_DIR / "nba_projections_full_1_77.csv")
+
+
+def _split_made_attempted(pct: pd.Series):
+    """ Hashtagbasketball percentages are labelled as X (Y/Z),
+    split them into percentage, made and attempted """
+    parts = pct.astype(str).str.extract(
+        r'^\s*([\d.]+)\s*\(\s*([\d.]+)\s*/\s*([\d.]+)\s*\)'
+    ).astype(float)
+    return parts[0] * 100, parts[1], parts[2]
+
+
+def _read_hashtagbasketball(filename: str) -> pd.DataFrame:
+    df = (
+        pd.read_csv(STATICDATA_DIR / filename)
+        .rename(columns={"R#": "RNK", "3pm": "3PM", "TOTAL": "Value"})
+    )
+    df["FG%"], df["FGM"], df["FGA"] = _split_made_attempted(df["FG%"])
+    df["FT%"], df["FTM"], df["FTA"] = _split_made_attempted(df["FT%"])
+    return df
+
+
+def _read_fantasypros() -> pd.DataFrame:
+    df = (
+        pd.read_csv(
+            STATICDATA_DIR /
+            "FantasyPros_NBA_Fantasy_Basketball_Overall_2025-26_Average_Projections.csv"
+        )
+        .rename(columns={
+            "Player": "PLAYER",
+            "Team": "TEAM",
+            "Positions": "POS",
+            "REB": "TREB",
+            "MIN": "MPG",
+        })
+    )
+    df["FG%"] = df["FG%"] * 100
+    df["FT%"] = df["FT%"] * 100
+    return df
+
+
+PROJECTION_SOURCES: Dict[str, ProjectionSource] = {
+    source.name: source for source in [
+        ProjectionSource(
+            "fanscout", _read_fanscout, remote=True,
+            fallback="nba_projections_full"
+        ),
+        ProjectionSource("nba_projections_full", _read_nba_projections_full),
+        ProjectionSource(
+            "hashtagbasketball",
+            lambda: _read_hashtagbasketball("hashtagbballsnapshot.csv")
+        ),
+        ProjectionSource(
+            "hashtagbasketball_2023",
+            lambda: _read_hashtagbasketball("2023hashtagbasketballprojections.csv")
+        ),
+        ProjectionSource("fantasypros", _read_fantasypros),
+    ]
+}
+DEFAULT_SOURCE = "fanscout"
+
+
+def source_names() -> List[str]:
+    return list(PROJECTION_SOURCES)
+
+
+def _percentage(col: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype(float)
+    return col.astype(str).str.rstrip("%").astype(float)
+
+
+def normalize_projections(df: pd.DataFrame) -> pd.DataFrame:
+    """ Coerce any projection source into PROJECTION_COLS,
+    sorted by Value. Missing values are derived where possible """
+    df = df.copy()
+    df["FG%"] = _percentage(df["FG%"])
+    df["FT%"] = _percentage(df["FT%"])
+    for col in ["FGM", "FGA", "FTM", "FTA", "MPG", "POS", "TEAM"]:
+        if col not in df:
+            df[col] = None
+    df["FGM"] = df["FGM"].fillna(df["FG%"] / 100 * df["FGA"])
+    df["FTM"] = df["FTM"].fillna(df["FT%"] / 100 * df["FTA"])
+    if "Value" not in df:
+        # Sum of z-scores, turnovers count against a player
+        stats = df[STAT_COLS].astype(float)
+        zscores = (stats - stats.mean()) / stats.std(ddof=0)
+        zscores["TO"] = -zscores["TO"]
+        df["Value"] = zscores.sum(axis=1)
+    if "RNK" not in df:
+        df["RNK"] = df["Value"].rank(ascending=False, method="first")
+    df["drafted_by"] = 0
+    df = df.astype({
+        "RNK": int, "Value": float, "GP": int, "MPG": float,
+        **{col: float for col in [*STAT_COLS, "FGM", "FGA", "FTM", "FTA"]},
+    })
+    df["POS"] = df["POS"].astype(object).where(df["POS"].notna(), None)
+    df["TEAM"] = df["TEAM"].astype(object).where(df["TEAM"].notna(), None)
+
+    return (
+        df[PROJECTION_COLS]
+        .sort_values("Value", ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    return pa.Table.from_pandas(
+        df, preserve_index=False,
+        schema=pa.schema([
+            (col, pa.string() if col in ("PLAYER", "POS", "TEAM") else
+             pa.int64() if col in ("RNK", "GP", "drafted_by") else
+             pa.float64())
+            for col in PROJECTION_COLS
+        ])
+    )
+
+
+def snapshot_path(name: str) -> Path:
+    return SNAPSHOT_DIR / f"{name}.parquet"
+
+
+def _load_source(name: str) -> pa.Table:
+    """ Load and normalize one source, snapshotting it to Parquet.
+    If a remote source cannot be reached, serve its last snapshot,
+    then its fallback source """
+    import pyarrow.parquet as pq
+
+    source = PROJECTION_SOURCES[name]
+    try:
+        table = _to_arrow(normalize_projections(source.load()))
+    except Exception as e:
+        if not source.remote:
+            raise
+        if snapshot_path(name).exists():
+            warnings.warn(f"Using snapshot of {name} projections: {e}")
+            return pq.read_table(snapshot_path(name))
+        if source.fallback is None:
+            raise
+        warnings.warn(f"Using {source.fallback} projections instead of {name}: {e}")
+        return load_projection_table(source.fallback)
+    if source.remote:
+        try:
+            SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, snapshot_path(name))
+        except OSError as e:
+            warnings.warn(f"Could not snapshot {name} projections: {e}")
+    return table
+
+
+_tables: Dict[str, pa.Table] = {}
+_tables_lock = threading.RLock()
+
+
+def load_projection_table(name: str = DEFAULT_SOURCE) -> pa.Table:
+    """ Normalized projections from a registered source, loaded once per
+    process. Arrow tables are immutable, so every session can share it """
+    with _tables_lock:
+        if name not in _tables:
+            _tables[name] = _load_source(name)
+        return _tables[name]
+
+
+def reload_projection_table(name: str = DEFAULT_SOURCE) -> pa.Table:
+    """ Drop the in-process copy of a source and load it again """
+    with _tables_lock:
+        _tables.pop(name, None)
+        return load_projection_table(name)
@@ -0,0 +1,116 @@
+import datetime
+from typing import Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ScheduleIndex:
+    """ Cumulative games-per-team index over the NBA schedule
+
+    Row i of `cumulative` holds, for every NBA team, the number of games
+    played strictly before `dates[i]`, with one extra trailing row for
+    the whole season. Counting games in [start_date, end_date) is then
+    a binary search on `dates` plus a subtraction.
+    """
+    def __init__(self, schedule: pd.DataFrame):
+        schedule = schedule.sort_index()
+        self.dates = schedule.index.values.astype('datetime64[ns]')
+        self.team_ids = [int(col) for col in schedule.columns]
+        self.team_positions = {
+            team_id: i for i, team_id in enumerate(self.team_ids)
+        }
+        games = schedule.fillna(0.0).to_numpy(dtype=np.float64)
+        self.cumulative = np.zeros(
+            (len(self.dates) + 1, len(self.team_ids)), dtype=np.float64
+        )
+        np.cumsum(games, axis=0, out=self.cumulative[1:])
+
+    @classmethod
+    def from_arrays(
+        cls,
+        dates: np.ndarray,
+        team_ids: Sequence[int],
+        cumulative: np.ndarray
+    ) -> "ScheduleIndex":
+        """ Rebuild an index around existing arrays without copying them,
+        e.g. arrays backed by shared memory """
+        index = cls.__new__(cls)
+        index.dates = dates
+        index.team_ids = [int(team_id) for team_id in team_ids]
+        index.team_positions = {
+            team_id: i for i, team_id in enumerate(index.team_ids)
+        }
+        index.cumulative = cumulative
+        return index
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _positions(self, dates: Iterable[datetime.datetime]) -> np.ndarray:
+        """ Row in `cumulative` counting games before each date"""
+        return np.searchsorted(
+            self.dates,
+            np.asarray(list(dates), dtype='datetime64[ns]'),
+            side='left'
+        )
+
+    def team_column(self, team_id: int) -> int:
+        return self.team_positions[int(team_id)]
+
+    def num_games(
+        self,
+        team_id: int,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime
+    ) -> float:
+        """ Number of games for one NBA team
+
+        start_date <= date_range < end_date """
+        start, end = self._positions([start_date, end_date])
+        col = self.team_column(team_id)
+        return self.cumulative[end, col] - self.cumulative[start, col]
+
+    def num_games_many(
+        self,
+        date_ranges: Sequence[Tuple[datetime.datetime, datetime.datetime]]
+    ) -> np.ndarray:
+        """ Number of games for every NBA team over many date ranges
+
+        Returns an array of shape (len(date_ranges), len(team_ids)),
+        columns ordered as `team_ids`"""
+        if len(date_ranges) == 0:
+            return np.zeros((0, len(self.team_ids)))
+        starts, ends = zip(*date_ranges)
+        return (
+            self.cumulative[self._positions(ends)] -
+            self.cumulative[self._positions(starts)]
+        )
+
+    def num_games_by_team(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime
+    ) -> Dict[int, float]:
+        """ Map every NBA team id to its number of games in a date range"""
+        counts = self.num_games_many([(start_date, end_date)])[0]
+        return dict(zip(self.team_ids, counts))
+
+    def daily_games(
+        self,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ Calendar days with games in start_date <= date < end_date and,
+        for each day, the games every NBA team plays
+
+        Returns days of shape (days,) and games of shape
+        (days, len(team_ids)), columns ordered as `team_ids` """
+        start, end = self._positions([start_date, end_date])
+        days = np.unique(self.dates[start:end].astype('datetime64[D]'))
+        # Row in `cumulative` where each day (and the range) ends
+        bounds = np.append(
+            np.maximum(np.searchsorted(self.dates, days, side='left'), start),
+            end
+        )
+        return days, np.diff(self.cumulative[bounds], axis=0)
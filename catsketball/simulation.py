@@ -0,0 +1,322 @@
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from espn_api.basketball import Player, League, Team
+
+import constants
+from constants import CATEGORIES, LOWER_IS_BETTER
+import espn_stats
+from schedule import ScheduleIndex
+
+
+class SimulationInputs(NamedTuple):
+    """ Everything a simulation needs, as plain arrays so it can be
+    shipped to worker processes """
+    team_names: List[str]
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]]
+    means: np.ndarray  # (players, keep_keys) per-game means
+    stds: np.ndarray  # (players, keep_keys) uncertainty in those means
+    games: np.ndarray  # (date_ranges, players) games played
+    membership: np.ndarray  # (teams, players) 1 if rostered by the team
+
+
+class MatchupSimulation(NamedTuple):
+    """ Win probabilities for every (team, opponent) pair in every date range
+
+    category_win_prob has shape (date_ranges, teams, teams, CATEGORIES)
+    and win_prob has shape (date_ranges, teams, teams). Ties count
+    as half a win. The diagonal (a team against itself) is 0.5 """
+    team_names: List[str]
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]]
+    category_win_prob: np.ndarray
+    win_prob: np.ndarray
+    n_sims: int
+
+    def win_prob_frame(self, week: int = 0) -> pd.DataFrame:
+        """ Probability that the row team beats the column team """
+        return pd.DataFrame(
+            self.win_prob[week],
+            index=pd.Index(self.team_names, name="Name"),
+            columns=self.team_names
+        )
+
+    def category_win_prob_frame(
+        self,
+        team_name: str,
+        opponent_name: str,
+        week: int = 0
+    ) -> pd.DataFrame:
+        """ Per-category probabilities that `team_name` beats `opponent_name`
+        in the `week`-th date range, as one row """
+        i = self.team_names.index(team_name)
+        j = self.team_names.index(opponent_name)
+        return pd.DataFrame(
+            self.category_win_prob[week, i, j][np.newaxis],
+            index=pd.MultiIndex.from_tuples(
+                [self.date_ranges[week]], names=["start_date", "end_date"]
+            ),
+            columns=CATEGORIES
+        )
+
+    def expected_wins(self) -> pd.Series:
+        """ Expected matchup wins per team against the average opponent,
+        summed over every date range """
+        n_teams = len(self.team_names)
+        if n_teams < 2:
+            return pd.Series(0.0, index=self.team_names)
+        against_others = (
+            self.win_prob.sum(axis=2) - 0.5
+        ) / (n_teams - 1)
+        return pd.Series(
+            against_others.sum(axis=0),
+            index=pd.Index(self.team_names, name="Name")
+        )
+
+
+def estimate_player_distributions(
+    players: List[Player],
+    include_dtdq=False,
+    include_o=False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Per-game mean and standard deviation of every stat for every player
+
+    The mean is the same average of season / last-30 / projected estimates
+    as get_avg_stats_player. The standard deviation is the spread between
+    those estimates, i.e. how unsure we are of the player's true rate;
+    game-to-game variation is added when sampling. Players with a single
+    estimate have no rate uncertainty. Both arrays have shape
+    (players, keep_keys), ignored players are all zeros """
+    values, available = espn_stats.extract_stat_matrix(players)
+    ignored = espn_stats.get_ignored_mask(
+        players, include_dtdq=include_dtdq, include_o=include_o
+    )
+    means = espn_stats.reduce_stat_matrix(
+        values, available, ignored
+    )[:, :len(constants.keep_keys)]
+
+    valid = available[:, np.newaxis, :] & ~np.isnan(values)
+    counts = valid.sum(axis=2)
+    deviations = np.where(valid, values - means[..., np.newaxis], 0.0)
+    variances = np.divide(
+        (deviations ** 2).sum(axis=2), counts,
+        out=np.zeros_like(means), where=counts > 0
+    )
+    variances[ignored] = 0.0
+
+    return means, np.sqrt(variances)
+
+
+def build_simulation_inputs(
+    league: League,
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    teams: Optional[List[Team]] = None,
+    team_id_name_mapping: Optional[dict] = None,
+    schedule: Optional[ScheduleIndex] = None,
+    include_dtdq=False,
+    include_o=False
+) -> SimulationInputs:
+    """ Player distributions, games and rosters for simulating
+    every team over every date range """
+    if teams is None:
+        teams = league.teams
+    if team_id_name_mapping is None:
+        team_id_name_mapping = constants.get_team_name_mapping()
+    if schedule is None:
+        schedule = constants.get_schedule_index()
+
+    all_players = [player for team in teams for player in team.roster]
+    means, stds = estimate_player_distributions(
+        all_players, include_dtdq=include_dtdq, include_o=include_o
+    )
+    membership = np.zeros((len(teams), len(all_players)))
+    membership[
+        np.repeat(np.arange(len(teams)), [len(team.roster) for team in teams]),
+        np.arange(len(all_players))
+    ] = 1.0
+
+    # Trailing column of zeros for players without a schedule
+    games = np.pad(schedule.num_games_many(date_ranges), ((0, 0), (0, 1)))
+    player_games = games[
+        :, espn_stats.get_schedule_columns(
+            all_players, schedule, team_id_name_mapping
+        )
+    ]
+
+    return SimulationInputs(
+        team_names=[team.team_name for team in teams],
+        date_ranges=list(date_ranges),
+        means=means,
+        stds=stds,
+        games=player_games,
+        membership=membership
+    )
+
+
+def sample_team_totals(
+    inputs: SimulationInputs,
+    n_sims: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """ Sample category totals for every team over every date range
+
+    Each simulation draws every player's true per-game rates once
+    (normal around the mean, with the spread between estimates). Given
+    those rates, every game is a Poisson stat line, with each attempt
+    made at the player's sampled percentage. Sums of Poisson draws are
+    Poisson, and makes / misses of Poisson attempts are independent
+    Poissons, so team totals are drawn directly from the summed rates
+    rather than player by player and game by game.
+
+    Returns an array of shape (n_sims, date_ranges, teams, keep_keys) """
+    key_index = {k: i for i, k in enumerate(constants.keep_keys)}
+    n_weeks, n_teams = len(inputs.date_ranges), len(inputs.team_names)
+    rates = np.clip(
+        inputs.means + inputs.stds * rng.standard_normal(
+            (n_sims, *inputs.means.shape)
+        ),
+        0.0, None
+    )
+    for made, attempted in [('FGM', 'FGA'), ('FTM', 'FTA')]:
+        # Misses in place of attempts, makes can't exceed attempts
+        rates[..., key_index[made]] = np.minimum(
+            rates[..., key_index[made]], rates[..., key_index[attempted]]
+        )
+        rates[..., key_index[attempted]] -= rates[..., key_index[made]]
+
+    # (date_ranges x teams, players) games each team gets from each player
+    team_games = (
+        inputs.games[:, np.newaxis, :] * inputs.membership[np.newaxis, :, :]
+    ).reshape(n_weeks * n_teams, -1)
+    expected = np.matmul(team_games, rates)
+
+    totals = rng.poisson(expected).astype(np.float64)
+    for made, attempted in [('FGM', 'FGA'), ('FTM', 'FTA')]:
+        totals[..., key_index[attempted]] += totals[..., key_index[made]]
+
+    return totals.reshape(n_sims, n_weeks, n_teams, len(constants.keep_keys))
+
+
+def count_matchup_wins(categories: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Count wins of every team against every other team
+
+    From categories of shape (n_sims, date_ranges, teams, CATEGORIES),
+    returns category wins of shape (date_ranges, teams, teams, CATEGORIES)
+    and matchup wins of shape (date_ranges, teams, teams),
+    summed over simulations. Ties are half a win """
+    sign = np.array([
+        -1.0 if category in LOWER_IS_BETTER else 1.0
+        for category in CATEGORIES
+    ])
+    outcome = np.sign(
+        (categories[:, :, :, np.newaxis, :] - categories[:, :, np.newaxis, :, :])
+        * sign
+    )
+    category_wins = ((outcome + 1) / 2).sum(axis=0)
+    matchup_wins = ((np.sign(outcome.sum(axis=-1)) + 1) / 2).sum(axis=0)
+
+    return category_wins, matchup_wins
+
+
+def _simulate_chunk(
+    inputs: SimulationInputs,
+    n_sims: int,
+    seed: np.random.SeedSequence
+) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return count_matchup_wins(
+        espn_stats.team_categories(sample_team_totals(inputs, n_sims, rng))
+    )
+
+
+def simulate_matchups(
+    inputs: SimulationInputs,
+    n_sims: int = 1000,
+    chunk_size: int = 100,
+    n_jobs: int = 1,
+    seed: Optional[int] = None
+) -> MatchupSimulation:
+    """ Monte Carlo win probabilities for every pair of teams
+    in every date range
+
+    Simulations run in chunks of `chunk_size` to bound memory,
+    spread over `n_jobs` worker processes when n_jobs > 1.
+    Every chunk has its own random stream, so a given seed
+    gives the same result for any n_jobs """
+    chunk_sizes = [chunk_size] * (n_sims // chunk_size)
+    if n_sims % chunk_size > 0:
+        chunk_sizes.append(n_sims % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if n_jobs > 1 and len(chunk_sizes) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(
+                _simulate_chunk,
+                [inputs] * len(chunk_sizes), chunk_sizes, seeds
+            ))
+    else:
+        results = [
+            _simulate_chunk(inputs, size, chunk_seed)
+            for size, chunk_seed in zip(chunk_sizes, seeds)
+        ]
+
+    n_weeks, n_teams = len(inputs.date_ranges), len(inputs.team_names)
+    category_wins = np.zeros((n_weeks, n_teams, n_teams, len(CATEGORIES)))
+    matchup_wins = np.zeros((n_weeks, n_teams, n_teams))
+    for chunk_category_wins, chunk_matchup_wins in results:
+        category_wins += chunk_category_wins
+        matchup_wins += chunk_matchup_wins
+
+    return MatchupSimulation(
+        team_names=inputs.team_names,
+        date_ranges=inputs.date_ranges,
+        category_win_prob=category_wins / max(n_sims, 1),
+        win_prob=matchup_wins / max(n_sims, 1),
+        n_sims=n_sims
+    )
+
+
+def matchup_weeks(
+    start_date: datetime.datetime,
+    end_date: datetime.datetime
+) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """ Monday-to-Monday date ranges covering [start_date, end_date),
+    the first and last ranges are cut short at the ends """
+    date_ranges = []
+    week_start = start_date
+    while week_start < end_date:
+        next_monday = (
+            week_start + datetime.timedelta(days=7 - week_start.weekday())
+        )
+        next_monday = datetime.datetime.combine(
+            next_monday.date(), datetime.datetime.min.time()
+        )
+        week_end = min(next_monday, end_date)
+        date_ranges.append((week_start, week_end))
+        week_start = week_end
+
+    return date_ranges
+
+
+def simulate_league(
+    league: League,
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    teams: Optional[List[Team]] = None,
+    n_sims: int = 1000,
+    n_jobs: int = 1,
+    seed: Optional[int] = None,
+    include_dtdq=False,
+    include_o=False
+) -> MatchupSimulation:
+    """ Simulate every team (or a subset of teams) in the league
+    over every date range, e.g. the rest of the season's
+    matchup_weeks """
+    inputs = build_simulation_inputs(
+        league, date_ranges, teams=teams,
+        include_dtdq=include_dtdq, include_o=include_o
+    )
+    return simulate_matchups(
+        inputs, n_sims=n_sims, n_jobs=n_jobs, seed=seed
+    )
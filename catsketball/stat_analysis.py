@@ -1,86 +1,20 @@
-import copy
-import re
-import requests
-from typing import Any, Dict, Optional
+import functools
+from typing import Any, Dict, Optional, Union
 
 import numpy as np
-from pathlib import Path
 import pandas as pd
 import pyarrow as pa
-import pyarrow.csv as csv
-import pyarrow.compute as pc
-from scipy.stats import zscore
-from sklearn.preprocessing import StandardScaler
-import streamlit as st
 
-STAT_COLS = ["FG%", "FT%", "3PM", "PTS", "TREB", "AST", "STL", "BLK", "TO"]
+from instrumentation import timed
+from projection_sources import DEFAULT_SOURCE, STAT_COLS, load_projection_table
+
 POSITIONS = ["PG", "SG", "SF", "PF", "C"]
 RE_PATTERN = r'^(\d+)*'#\s*(.*)'
 
-@st.cache_data
-def load_projections() -> pa.Table:
-    # html_content = requests.get("https://hashtagbasketball.com/fantasy-basketball-projections").content
-    # pd_tables = pd.read_html(html_content)
-    # pd_df = pd_tables[2][lambda df_: df_["R#"] != "R#"]
-    # pd_df["R#"] = pd_df["R#"].apply(lambda val: re.search(RE_PATTERN, val).group(0))
-    # pd_df = (
-    #     pd_df
-    #     .astype({
-    #         "R#": "int",
-    #         "ADP": "float",
-    #         "GP": "int",
-    #         "3PM": "float",
-    #         "PTS": "float",
-    #         "TREB": "float",
-    #         "AST": "float",
-    #         "STL": "float",
-    #         "BLK": "float",
-    #         "TO": "float"
-    #     })
-    # )
-    # df = pa.Table.from_pandas(pd_df)
-    # fg_index = df.schema.names.index("FG%")
-    # ft_index = df.schema.names.index("FT%")
-    # df = (
-    #     df.append_column("drafted_by", [[0]*len(df)])
-    #     .set_column(
-    #         fg_index, "FG%", 
-    #         [[format_percentages(a) for a in df["FG%"]]]
-    #     )
-    #     .set_column(
-    #         ft_index, "FT%", 
-    #         [[format_percentages(a) for a in df["FT%"]]]
-    #     )
-    # )
-    # for pos in POSITIONS:
-    #     df = df.append_column(pos, pc.count_substring(df["POS"], pos))
-    
-    # df = (
-    #     df.sort_by("ADP")
-    #     .select(["PLAYER", "R#", "ADP", "GP", "drafted_by", "POS", "TEAM", *STAT_COLS, "MPG", *POSITIONS])
-    # )
-    df = (
-        #pd.read_csv("./staticdata/nba_projections_full_1_77.csv")
-        pd.read_html("https://fanscout.pro/projections")[0]
-        .rename(columns={
-            "Name": "PLAYER",
-            "G": "GP",
-            "M": "MPG",
-            "TPM": "3PM",
-            "REB": "TREB",
-            "TOV": "TO"
-        })
-        .pipe(remove_percentage_symbol)
-        .pipe(compute_fgm_fta)
-        .sort_values("Value", ascending=False)
-        .assign(
-            POS=None,
-            drafted_by=0,
-        )
-    )
-    df = pa.Table.from_pandas(df)
-    
-    return df
+def load_projections(source: str = DEFAULT_SOURCE) -> pa.Table:
+    """ Projections from a registered source, see projection_sources.
+    Loaded once per process and shared, do not modify """
+    return load_projection_table(source)
 
 
 def format_percentages(pa_string):
@@ -115,65 +49,196 @@ def encode_positions(val):
     return pd.Series(positions)
 
 
-def init_standardizers() -> Dict[str, StandardScaler]:
-    return {stat: StandardScaler() for stat in STAT_COLS}
- 
+class IncrementalStandardizer:
+    """ Standardize STAT_COLS against players who have not been drafted,
+    keeping running sums so drafting or undrafting a player updates
+    the means and variances in O(1) per stat
     
-def fit_standardizers(
-    table: pa.Table,
-    standardizers: Dict[str, StandardScaler]
-) -> None:
-    """ Fit standardizers to players who not been drafted"""
-    for stat, standardizer in standardizers.items():
-        standardizer.fit(
-            table
-            .filter(pc.equal(table["drafted_by"], 0))
-            [stat]
-            .to_numpy()
-            .reshape(-1,1)
+    Same z-scores as sklearn's StandardScaler fit on the undrafted pool
+    (population variance, unit scale for constant columns) """
+    def __init__(self, values: np.ndarray, drafted_by: np.ndarray):
+        self.values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(self.values)
+        # Accumulate around the column means to limit cancellation
+        counts = valid.sum(axis=0)
+        self.shift = np.divide(
+            np.where(valid, self.values, 0.0).sum(axis=0), counts,
+            out=np.zeros(self.values.shape[1]), where=counts > 0
         )
+        self.available = np.asarray(drafted_by) == 0
         
-def standardize(
-    table: pa.Table,
-    standardizers: Dict[str, StandardScaler]
-) -> pa.Table:
-    """ Apply standardizers to all players"""
-    stdzd_table = copy.copy(table)
-    for stat, standardizer in standardizers.items():
-        col_idx = stdzd_table.schema.names.index(stat)
-        stdzd_table = stdzd_table.set_column(
-            col_idx, stat,
-            standardizer.transform(stdzd_table[stat].to_numpy().reshape(-1,1))
+        pool = self.available
+        centered = np.where(valid[pool], self.values[pool] - self.shift, 0.0)
+        self.count = valid[pool].sum(axis=0).astype(np.float64)
+        self.sum = centered.sum(axis=0)
+        self.sum_sq = (centered ** 2).sum(axis=0)
+        
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "IncrementalStandardizer":
+        return cls(
+            np.column_stack([
+                table[stat].to_numpy(zero_copy_only=False) 
+                for stat in STAT_COLS
+            ]),
+            table["drafted_by"].to_numpy(zero_copy_only=False)
+        )
+        
+    def set_drafted_by(self, idx: int, drafted_by: Optional[int]) -> None:
+        """ Update the undrafted pool after a single draft edit"""
+        available = drafted_by == 0
+        if available == self.available[idx]:
+            return
+        sign = 1.0 if available else -1.0
+        row = self.values[idx]
+        valid = ~np.isnan(row)
+        centered = np.where(valid, row - self.shift, 0.0)
+        self.count += sign * valid
+        self.sum += sign * centered
+        self.sum_sq += sign * centered ** 2
+        self.available[idx] = available
+    
+    @property
+    def mean_(self) -> np.ndarray:
+        centered_mean = np.divide(
+            self.sum, self.count, 
+            out=np.zeros_like(self.sum), where=self.count > 0
         )
+        return self.shift + centered_mean
+    
+    @property
+    def scale_(self) -> np.ndarray:
+        centered_mean = np.divide(
+            self.sum, self.count, 
+            out=np.zeros_like(self.sum), where=self.count > 0
+        )
+        mean_sq = np.divide(
+            self.sum_sq, self.count, 
+            out=np.zeros_like(self.sum_sq), where=self.count > 0
+        )
+        var = np.maximum(mean_sq - centered_mean ** 2, 0.0)
+        scale = np.sqrt(var)
+        # Same treatment of (near) constant columns as StandardScaler
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        return scale
+    
+    def transform(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Z-scores of every player, players x STAT_COLS"""
+        out = np.subtract(self.values, self.mean_, out=out)
+        return np.divide(out, self.scale_, out=out)
+        
         
-    return stdzd_table
+def standardize_table(
+    table: pa.Table, 
+    standardizer: IncrementalStandardizer
+) -> pd.DataFrame:
+    """ Replace STAT_COLS with z-scores in one vectorized assignment"""
+    stdzd_df = table.to_pandas()
+    stdzd_df[STAT_COLS] = standardizer.transform()
+    return stdzd_df
+    
 
-def update_zscores() -> None:
-    change_info = st.session_state.drafting_changes["edited_rows"]
-    drafted_col = st.session_state.projections_modified["drafted_by"].to_pylist()
-    for idx, change_dict in change_info.items():
-         drafted_col[idx] = change_dict["drafted_by"]
-            
-    drafted_index = st.session_state.projections_modified.schema.names.index("drafted_by")
-    st.session_state.projections_modified = (
-        st.session_state.projections_modified
-        .set_column(
-            drafted_index, "drafted_by", 
-            [drafted_col]
+class ProjectionBase:
+    """ Read-only projections shared by every session
+    
+    STAT_COLS live in one column-major float matrix (each stat is 
+    contiguous, so Arrow columns are zero-copy views) and the remaining 
+    columns stay in the immutable Arrow table """
+    def __init__(self, table: pa.Table):
+        self.column_names = table.schema.names
+        self.metadata = table.drop_columns([*STAT_COLS, "drafted_by"])
+        self.stats = np.asfortranarray(np.column_stack([
+            table[stat].to_numpy(zero_copy_only=False).astype(np.float64) 
+            for stat in STAT_COLS
+        ]))
+        self.stats.flags.writeable = False
+        self.drafted_by = (
+            table["drafted_by"].to_numpy(zero_copy_only=False)
+            .astype(np.int64)
         )
-    )
-            
-    fit_standardizers(
-        st.session_state.projections_modified, 
-        st.session_state.standardizers
-    )
+        self.drafted_by.flags.writeable = False
+        
+        
+@functools.lru_cache(maxsize=None)
+@timed()
+def get_projection_base(source: str = DEFAULT_SOURCE) -> ProjectionBase:
+    return ProjectionBase(load_projections(source))
+        
+
+class ProjectionsStore:
+    """ Draft board projections for one session
     
-    stdzd_table = standardize(
-        st.session_state.projections_modified, 
-        st.session_state.standardizers
-    )
+    A lightweight overlay on a shared ProjectionBase: only `drafted_by`,
+    the standardizer's running sums and the z-score matrix belong to 
+    the session. Draft edits and z-scores are applied in place rather 
+    than rebuilding tables """
+    def __init__(self, base: Union[pa.Table, ProjectionBase]):
+        if isinstance(base, pa.Table):
+            base = ProjectionBase(base)
+        self.base = base
+        self.column_names = base.column_names
+        self.metadata = base.metadata
+        self.stats = base.stats
+        self.drafted_by = base.drafted_by.copy()
+        self.standardizer = IncrementalStandardizer(self.stats, self.drafted_by)
+        self.zscores = np.empty_like(self.stats, order='F')
+        self.standardizer.transform(out=self.zscores)
+        
+    def __len__(self):
+        return len(self.drafted_by)
+        
+    def set_drafted_by(self, idx: int, drafted_by: Optional[int]) -> None:
+        drafted_by = 0 if drafted_by is None else int(drafted_by)
+        self.drafted_by[idx] = drafted_by
+        self.standardizer.set_drafted_by(idx, drafted_by)
+        
+    @timed()
+    def apply_edits(self, edited_rows: Dict[int, Dict[str, Any]]) -> None:
+        """ Apply data editor edits and refresh z-scores in place"""
+        for idx, change_dict in edited_rows.items():
+            if "drafted_by" in change_dict:
+                self.set_drafted_by(int(idx), change_dict["drafted_by"])
+        self.standardizer.transform(out=self.zscores)
+        
+    @timed()
+    def to_arrow(self, standardized: bool = False) -> pa.Table:
+        """ Arrow view of the projections, stat columns are not copied"""
+        stats = self.zscores if standardized else self.stats
+        columns = {
+            name: self.metadata[name] 
+            for name in self.metadata.schema.names
+        }
+        columns["drafted_by"] = pa.array(self.drafted_by)
+        for i, stat in enumerate(STAT_COLS):
+            columns[stat] = pa.array(stats[:, i])
+        return pa.table({name: columns[name] for name in self.column_names})
+    
+    def to_pandas(self, standardized: bool = False) -> pd.DataFrame:
+        return self.to_arrow(standardized=standardized).to_pandas()
     
-    st.session_state.stdzd_table = stdzd_table.to_pandas()
+    def available(self) -> np.ndarray:
+        return self.drafted_by == 0
+        
+    @timed()
+    def compare_teams(self) -> pd.DataFrame:
+        """ Sum of GP and z-scores per drafting team, same as compare_teams"""
+        teams, team_idx = np.unique(self.drafted_by, return_inverse=True)
+        values = np.column_stack([
+            self.metadata["GP"].to_numpy(zero_copy_only=False), self.zscores
+        ])
+        grouped = np.zeros((len(teams), values.shape[1]))
+        np.add.at(grouped, team_idx, values)
+        return pd.DataFrame(
+            grouped, 
+            index=pd.Index(teams, name="drafted_by"), 
+            columns=["GP", *STAT_COLS]
+        )
+
+
+def update_zscores() -> None:
+    import streamlit as st
+    st.session_state.projection_store.apply_edits(
+        st.session_state.drafting_changes["edited_rows"]
+    )
 
 def compare_teams(df: Optional[pd.DataFrame]) -> Any:
     if df is None: 
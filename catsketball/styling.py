@@ -1,55 +1,117 @@
-from typing import Optional
+from collections import OrderedDict
+import functools
+import threading
+from typing import Optional, Tuple
 from colour import Color
+import numpy as np
 import pandas as pd
 
+from constants import LOWER_IS_BETTER
+from instrumentation import count, span, timed
+
 red = Color("#ff4d4d")
 green = Color("#00b300")
+# Rendered HTML tables kept by categories_html
+HTML_CACHE_SIZE = 64
+
+
+@functools.lru_cache(maxsize=None)
+def palette(n_colors: int) -> Tuple[str, ...]:
+    """ Green to red background styles, best to worst"""
+    return tuple(
+        f'background-color: {a.get_hex_l()}'
+        for a in green.range_to(red, n_colors)
+    )
+
+
+def rank_categories(df: pd.DataFrame) -> np.ndarray:
+    """ Integer rank (1 is best) of every cell within its column,
+    for the whole table at once. Ties share the floor of their
+    average rank, as `int(s.rank())` did """
+    values = df.to_numpy(dtype=np.float64, copy=True)
+    lower_is_better = np.array([col in LOWER_IS_BETTER for col in df.columns])
+    values[:, lower_is_better] *= -1
+    # (rows, rows, columns) comparisons of every cell with its column
+    better = (values[np.newaxis, :, :] > values[:, np.newaxis, :]).sum(axis=1)
+    tied = (values[np.newaxis, :, :] == values[:, np.newaxis, :]).sum(axis=1)
+    average_rank = better + (tied + 1) / 2
+    return np.clip(np.floor(average_rank).astype(int), 1, len(df))
+
+
+def color_categories(df: pd.DataFrame, n_colors: Optional[int] = None) -> pd.DataFrame:
+    """ Background style of every cell, for Styler.apply(axis=None)"""
+    if n_colors is None:
+        n_colors = len(df)
+    colors = np.array(palette(n_colors), dtype=object)
+    return pd.DataFrame(
+        colors[rank_categories(df) - 1], index=df.index, columns=df.columns
+    )
+
 
 def coloring(s: pd.Series, n_colors: Optional[int] = 2):
     """ Highlight cells for winning vs losing categories"""
-    possible_colors = [
-        f'background-color: {a.get_hex_l()}' 
-        for a in green.range_to(red, n_colors)
-    ]
-    if s.name == 'TO':
-        rankings = s.rank(ascending=True)
-    else:
-        rankings = s.rank(ascending=False)
-    my_colors = [
-        possible_colors[int(val) - 1] 
-        for val in rankings.values
-    ]
-    
-    return my_colors
+    return list(color_categories(s.to_frame(), n_colors=n_colors)[s.name])
 
 
 def build_tooltips(df: pd.DataFrame):
-    fgm = df['FGM'].round(1).astype(str)
-    fga = df['FGA'].round(1).astype(str)
-    ftm = df['FTM'].round(1).astype(str)
-    fta = df['FTA'].round(1).astype(str)
-    
-    tooltips = pd.concat([
-        (fgm+'/'+fga).rename("FG%"),
-        (ftm+'/'+fta).rename("FT%")
-    ], axis=1)
-    
+    made_attempted = df[['FGM', 'FGA', 'FTM', 'FTA']].round(1).astype(str)
+
+    tooltips = pd.DataFrame({
+        "FG%": made_attempted['FGM'] + '/' + made_attempted['FGA'],
+        "FT%": made_attempted['FTM'] + '/' + made_attempted['FTA'],
+    }, index=df.index)
+
     return tooltips
-    
-    
+
+
+@timed()
 def style_categories(df: pd.DataFrame, include_tooltips=True):
     if include_tooltips:
         df_to_show = df.drop(columns=['FGM', 'FGA', 'FTM', 'FTA'])
         tooltips = build_tooltips(df)
-    
+
         return (
             df_to_show.style
-            .apply(coloring, n_colors=len(df_to_show))
+            .apply(color_categories, axis=None, n_colors=len(df_to_show))
             .format(precision=2)
             .set_tooltips(tooltips)
         )
     return (
         df.style
-        .apply(coloring, n_colors=len(df))
+        .apply(color_categories, axis=None, n_colors=len(df))
         .format(precision=2)
-    )
\ No newline at end of file
+    )
+
+
+_html_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+_html_cache_lock = threading.Lock()
+
+
+def _frame_key(df: pd.DataFrame, include_tooltips: bool) -> Tuple:
+    """ Hash of a table's values, index and columns"""
+    return (
+        pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes(),
+        tuple(df.columns),
+        df.index.name,
+        include_tooltips,
+    )
+
+
+def categories_html(df: pd.DataFrame, include_tooltips=True) -> str:
+    """ style_categories(df).to_html(), rendered once per distinct table
+    and served from a small LRU cache on reruns where it is unchanged """
+    key = _frame_key(df, include_tooltips)
+    with _html_cache_lock:
+        if key in _html_cache:
+            _html_cache.move_to_end(key)
+            count("styling.html_cache.hits")
+            return _html_cache[key]
+    count("styling.html_cache.misses")
+    styler = style_categories(df, include_tooltips=include_tooltips)
+    with span("styling.to_html"):
+        html = styler.to_html()
+    with _html_cache_lock:
+        _html_cache[key] = html
+        while len(_html_cache) > HTML_CACHE_SIZE:
+            _html_cache.popitem(last=False)
+    return html
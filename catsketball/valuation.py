@@ -0,0 +1,204 @@
+import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from espn_api.basketball import League
+
+import constants
+from constants import CATEGORIES, LOWER_IS_BETTER
+import espn_stats
+from espn_stats import AVG_STAT_COLS, PlayerPool
+from schedule import ScheduleIndex
+from simulation import matchup_weeks
+
+
+def category_values(totals: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """ Per-category contributions from (..., players, AVG_STAT_COLS) totals
+
+    Counting categories are the totals themselves (turnovers negated).
+    FG% and FT% are makes above what the `reference` players' combined
+    percentage would give on the same attempts, so volume counts.
+    Returns (..., players, CATEGORIES) """
+    key_index = {k: i for i, k in enumerate(AVG_STAT_COLS)}
+    columns = []
+    for category in CATEGORIES:
+        if category in ('FG%', 'FT%'):
+            made = totals[..., key_index[category[:2] + 'M']]
+            attempted = totals[..., key_index[category[:2] + 'A']]
+            reference_made = (made * reference).sum(axis=-1, keepdims=True)
+            reference_attempted = (attempted * reference).sum(axis=-1, keepdims=True)
+            pct = np.divide(
+                reference_made, reference_attempted,
+                out=np.zeros_like(reference_made), where=reference_attempted > 0
+            )
+            columns.append(made - pct * attempted)
+        else:
+            columns.append(totals[..., key_index[category]])
+    values = np.stack(columns, axis=-1)
+    for i, category in enumerate(CATEGORIES):
+        if category in LOWER_IS_BETTER:
+            values[..., i] *= -1
+
+    return values
+
+
+def standardize_values(values: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """ Z-scores of (..., players, CATEGORIES) values against the
+    `reference` players, constant categories are left unscaled """
+    weights = reference[:, np.newaxis] / max(reference.sum(), 1)
+    mean = (values * weights).sum(axis=-2, keepdims=True)
+    var = (((values - mean) ** 2) * weights).sum(axis=-2, keepdims=True)
+    std = np.sqrt(var)
+    std[std < 10 * np.finfo(std.dtype).eps] = 1.0
+
+    return (values - mean) / std
+
+
+class PoolValuation(NamedTuple):
+    """ Schedule-aware category totals and z-scores for a player pool,
+    per date range and over all of them (rest of season) """
+    pool: PlayerPool
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]]
+    games: np.ndarray  # (date_ranges, players)
+    weekly_totals: np.ndarray  # (date_ranges, players, AVG_STAT_COLS)
+    weekly_zscores: np.ndarray  # (date_ranges, players, CATEGORIES)
+    totals: np.ndarray  # (players, AVG_STAT_COLS)
+    zscores: np.ndarray  # (players, CATEGORIES)
+
+    def frame(
+        self, 
+        week: Optional[int] = None, 
+        mask: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """ Games, category totals and Value (sum of z-scores) for every
+        player (or the players in `mask`), over one date range or 
+        (by default) all of them, best Value first """
+        if week is None:
+            games, totals, zscores = (
+                self.games.sum(axis=0), self.totals, self.zscores
+            )
+        else:
+            games, totals, zscores = (
+                self.games[week], self.weekly_totals[week],
+                self.weekly_zscores[week]
+            )
+        df = pd.DataFrame(
+            totals,
+            index=pd.Index(self.pool.names, name="Name"),
+            columns=AVG_STAT_COLS
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['FG%'] = df['FGM'] / df['FGA']
+            df['FT%'] = df['FTM'] / df['FTA']
+        df.insert(0, 'GP', games)
+        df.insert(0, 'Value', zscores.sum(axis=1))
+        if len(self.pool.player_ids) > 0:
+            df.insert(0, 'playerId', self.pool.player_ids)
+        if len(self.pool.pro_teams) > 0:
+            df.insert(1, 'proTeam', self.pool.pro_teams)
+        if mask is not None:
+            df = df[mask]
+
+        return df.fillna(0.0).sort_values("Value", ascending=False)
+
+    def zscore_frame(self, week: Optional[int] = None) -> pd.DataFrame:
+        zscores = self.zscores if week is None else self.weekly_zscores[week]
+        return pd.DataFrame(
+            zscores,
+            index=pd.Index(self.pool.names, name="Name"),
+            columns=CATEGORIES
+        )
+
+
+def value_pool(
+    pool: PlayerPool,
+    date_ranges: List[Tuple[datetime.datetime, datetime.datetime]],
+    reference: Optional[np.ndarray] = None,
+    team_id_name_mapping: Optional[dict] = None,
+    schedule: Optional[ScheduleIndex] = None
+) -> PoolValuation:
+    """ Value every player in the pool by what they produce in the games
+    their NBA team plays in each date range
+
+    The games-per-team-per-range matrix comes from the cumulative
+    schedule index, picking each player's column turns it into
+    (date_ranges, players) games; multiplying by per-game averages gives
+    every total at once. Z-scores are against the `reference` players
+    (default the whole pool) """
+    if team_id_name_mapping is None:
+        team_id_name_mapping = constants.get_team_name_mapping()
+    if schedule is None:
+        schedule = constants.get_schedule_index()
+    if reference is None:
+        reference = np.ones(len(pool), dtype=bool)
+    reference = np.asarray(reference, dtype=np.float64)
+
+    # Trailing column of zeros for players without a schedule
+    team_games = np.pad(schedule.num_games_many(date_ranges), ((0, 0), (0, 1)))
+    games = team_games[
+        :, espn_stats.get_schedule_columns(pool.pro_teams, schedule, team_id_name_mapping)
+    ]
+    per_game = pool.stats[:, :len(AVG_STAT_COLS)].copy()
+    # Percentages are recomputed from made / attempted totals
+    per_game[:, [AVG_STAT_COLS.index('FG%'), AVG_STAT_COLS.index('FT%')]] = 0.0
+
+    weekly_totals = games[:, :, np.newaxis] * per_game[np.newaxis, :, :]
+    totals = games.sum(axis=0)[:, np.newaxis] * per_game
+    weekly_zscores = standardize_values(
+        category_values(weekly_totals, reference), reference
+    )
+    zscores = standardize_values(category_values(totals, reference), reference)
+
+    return PoolValuation(
+        pool=pool,
+        date_ranges=list(date_ranges),
+        games=games,
+        weekly_totals=weekly_totals,
+        weekly_zscores=weekly_zscores,
+        totals=totals,
+        zscores=zscores
+    )
+
+
+def get_rostered_mask(league: League, pool: PlayerPool) -> np.ndarray:
+    """ Which pool players are on a fantasy roster in the league """
+    rostered = {
+        player.playerId for team in league.teams for player in team.roster
+    }
+    return np.array([
+        player_id in rostered for player_id in pool.player_ids
+    ], dtype=bool)
+
+
+def value_rest_of_season(
+    league: League,
+    start_date: Optional[datetime.datetime] = None,
+    end_date: Optional[datetime.datetime] = None,
+    all_player_stats: Optional[pd.DataFrame] = None,
+    schedule: Optional[ScheduleIndex] = None
+) -> PoolValuation:
+    """ Value the league's player pool over the matchup weeks from
+    `start_date` (default today) to `end_date` (default the end of
+    the NBA schedule)
+
+    `all_player_stats` defaults to pull_all_players(league) """
+    if schedule is None:
+        schedule = constants.get_schedule_index()
+    if all_player_stats is None:
+        all_player_stats = espn_stats.pull_all_players(league)
+    if start_date is None:
+        start_date = datetime.datetime.combine(
+            datetime.date.today(), datetime.time()
+        )
+    if end_date is None:
+        last_day = schedule.dates[-1].astype('datetime64[D]').item()
+        end_date = datetime.datetime.combine(
+            last_day + datetime.timedelta(days=1), datetime.time()
+        )
+
+    return value_pool(
+        PlayerPool.from_frame(all_player_stats),
+        matchup_weeks(start_date, end_date),
+        schedule=schedule
+    )
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+
+# Modules in catsketball/ import each other by name, as when run by streamlit
+sys.path.insert(0, str(Path(__file__).parents[1] / "catsketball"))
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def espn_fixtures() -> Path:
+    """ Payloads of a 2-team league recorded with PayloadCache.export_payloads """
+    return FIXTURES_DIR / "espn_payloads"
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    """ Fail any request that reaches the requests library """
+    def refuse(*args, **kwargs):
+        raise AssertionError(f"Unexpected network access: {args}")
+
+    monkeypatch.setattr(requests, "get", refuse)
+    monkeypatch.setattr(requests.Session, "request", refuse)
@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+import espn_fetch
+import espn_stats
+from espn_cache import CachedEspnRequests, PayloadCache, payload_key
+
+LEAGUE_ID = 12345
+YEAR = 2025
+ESPN_S2 = "fixture_s2"
+SWID = "{FIXTURE-SWID}"
+COOKIES = {"espn_s2": ESPN_S2, "SWID": SWID}
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(espn_fixtures, clock):
+    cache = PayloadCache(":memory:", clock=clock)
+    cache.import_payloads(espn_fixtures)
+    return cache
+
+
+def _espn_request(cookies=COOKIES):
+    return CachedEspnRequests(
+        PayloadCache(":memory:"), sport="nba", year=YEAR,
+        league_id=LEAGUE_ID, cookies=cookies
+    )
+
+
+def _key(request, cookies=COOKIES):
+    return espn_fetch.request_key(_espn_request(cookies), request)
+
+
+def test_fixtures_cover_every_league_request(cache):
+    league_request, *other_requests = espn_fetch.league_requests()
+    for request in [league_request, *other_requests, espn_fetch.player_pool_request(3)]:
+        assert cache.is_fresh(_key(request), request.params)
+
+
+def test_ttl_expires_per_view(cache, clock):
+    pool_request = espn_fetch.player_pool_request(3)
+    schedule_request = espn_fetch.EspnRequest("season", {"view": "proTeamSchedules_wl"})
+    league_request = espn_fetch.league_requests()[0]
+
+    # kona_player_info lives an hour, the schedule a day, and the league
+    # views as long as their shortest-lived view (mTeam, 15 minutes)
+    clock.now += 20 * 60
+    assert cache.get(_key(league_request), league_request.params) is None
+    assert cache.get(_key(pool_request), pool_request.params) is not None
+
+    clock.now += 60 * 60
+    assert cache.get(_key(pool_request), pool_request.params) is None
+    assert cache.get(_key(schedule_request), schedule_request.params) is not None
+
+    clock.now += 24 * 60 * 60
+    assert cache.get(_key(schedule_request), schedule_request.params) is None
+
+
+def test_custom_ttls_override_defaults(espn_fixtures, clock):
+    cache = PayloadCache(":memory:", ttls={"kona_player_info": 10}, clock=clock)
+    cache.import_payloads(espn_fixtures)
+    pool_request = espn_fetch.player_pool_request(3)
+    clock.now += 11
+    assert not cache.is_fresh(_key(pool_request), pool_request.params)
+
+
+def test_hit_and_miss_counters(cache, clock):
+    request = espn_fetch.player_pool_request(3)
+    key = _key(request)
+
+    assert cache.get(key, request.params) is not None
+    assert cache.get("not a key") is None
+    clock.now += 2 * 60 * 60
+    assert cache.get(key, request.params) is None
+    # is_fresh does not count
+    cache.is_fresh(key, request.params)
+
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+
+def test_cookies_are_part_of_the_key(cache, no_network):
+    request = espn_fetch.league_requests()[0]
+    other_cookies = {"espn_s2": "someone_else", "SWID": SWID}
+
+    assert payload_key(LEAGUE_ID, YEAR, "league", params=request.params) != _key(request)
+    assert _key(request, other_cookies) != _key(request)
+    assert cache.is_fresh(_key(request), request.params)
+    assert not cache.is_fresh(_key(request, other_cookies), request.params)
+
+    # Another user's cookies are never served this league's payloads
+    other_user = CachedEspnRequests(
+        cache, sport="nba", year=YEAR, league_id=LEAGUE_ID, cookies=other_cookies
+    )
+    with pytest.raises(AssertionError, match="network"):
+        other_user.get_league()
+
+
+def test_export_import_round_trip(cache, espn_fixtures, tmp_path):
+    cache.export_payloads(tmp_path)
+    restored = PayloadCache(":memory:")
+    restored.import_payloads(tmp_path)
+
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == sorted(
+        p.name for p in espn_fixtures.glob("*.json")
+    )
+    for fixture_path in tmp_path.glob("*.json"):
+        fixture = json.loads(fixture_path.read_text())
+        key = fixture["key"]
+        assert restored.get(key) == cache.get(key) == fixture["payload"]
+        assert restored._connection.execute(
+            "SELECT view, scoring_period, league_id, year FROM payloads WHERE key = ?",
+            (key,)
+        ).fetchone() == (fixture["view"], fixture["scoring_period"], LEAGUE_ID, YEAR)
+
+
+def test_invalidate_by_view(cache):
+    request = espn_fetch.player_pool_request(3)
+    league_request = espn_fetch.league_requests()[0]
+    cache.invalidate(view="kona_player_info")
+    assert not cache.is_fresh(_key(request), request.params)
+    assert cache.is_fresh(_key(league_request), league_request.params)
+
+
+def test_league_is_served_without_network(cache, no_network):
+    league = espn_stats.build_league(
+        league_id=LEAGUE_ID, year=YEAR, espn_s2=ESPN_S2, swid=SWID, cache=cache
+    )
+
+    assert [team.team_name for team in league.teams] == ["Team 1", "Team 2"]
+    assert [len(team.roster) for team in league.teams] == [3, 3]
+    assert league.current_week == 3
+    assert league.player_map[0] == "Player 0"
+
+    pool = espn_stats.fetch_pool_players(league)
+    assert sorted(player.playerId for player in pool) == list(range(6))
+    assert cache.misses == 0
+    assert cache.hits == len(espn_fetch.league_requests()) + 1
+
+    summary = espn_stats.summarize_league_per_team(league)
+    assert list(summary.index) == ["Team 1", "Team 2"]
+    assert (summary["PTS"] > 0).all()
@@ -0,0 +1,207 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+from espn_api.requests.espn_requests import EspnFantasyRequests
+
+import espn_fetch
+import espn_stats
+from espn_cache import PayloadCache
+from espn_fetch import EspnRequest, FetchClient, RateLimiter
+
+LEAGUE_ID = 12345
+YEAR = 2025
+COOKIES = {"espn_s2": "fixture_s2", "SWID": "{FIXTURE-SWID}"}
+
+
+def load_fixtures(directory) -> dict:
+    """ Recorded payloads by their first view """
+    payloads = {}
+    for fixture_path in directory.glob("*.json"):
+        fixture = json.loads(fixture_path.read_text())
+        payloads[fixture["view"].split(",")[0]] = fixture["payload"]
+    return payloads
+
+
+class StubEspn(BaseHTTPRequestHandler):
+    """ Serves recorded payloads by view, plus /flaky and /slow """
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        with server.lock:
+            server.requests.append(self.path)
+        if url.path.endswith("/flaky"):
+            with server.lock:
+                server.failures_left -= 1
+                fail = server.failures_left >= 0
+            if fail:
+                return self._send(int(query["code"][0]), {"error": "try again"})
+            return self._send(200, {"ok": True})
+        if url.path.endswith("/slow"):
+            time.sleep(float(query["delay"][0]))
+            return self._send(200, {"i": int(query["i"][0])})
+        payload = server.payloads.get(query.get("view", [""])[0])
+        if payload is None:
+            return self._send(404, {"error": "unknown view"})
+        # ESPN wraps league payloads in a list
+        return self._send(200, [payload] if "/leagues/" in url.path else payload)
+
+    def _send(self, status: int, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(espn_fixtures):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEspn)
+    server.daemon_threads = True
+    server.payloads = load_fixtures(espn_fixtures)
+    server.requests = []
+    server.failures_left = 0
+    server.lock = threading.Lock()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    client = FetchClient(max_workers=4, rate=1000.0, retries=3, backoff=0.0, timeout=5.0)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def espn_request(stub_server):
+    """ espn_api request layer pointed at the stub server """
+    espn_request = EspnFantasyRequests(
+        sport="nba", year=YEAR, league_id=LEAGUE_ID, cookies=COOKIES
+    )
+    espn_request.ENDPOINT = f"{stub_server.url}/seasons/{YEAR}"
+    espn_request.LEAGUE_ENDPOINT = (
+        f"{stub_server.url}/seasons/{YEAR}/segments/0/leagues/{LEAGUE_ID}"
+    )
+    return espn_request
+
+
+@pytest.mark.parametrize("code", [429, 500, 502, 503, 504])
+def test_retries_rate_limits_and_server_errors(stub_server, client, code):
+    stub_server.failures_left = 2
+    assert client.get_json(f"{stub_server.url}/flaky", params={"code": code}) == {"ok": True}
+    assert len(stub_server.requests) == 3
+    assert client.request_count == 1
+
+
+def test_gives_up_after_retries(stub_server, client):
+    stub_server.failures_left = 10
+    with pytest.raises(requests.RequestException):
+        client.get_json(f"{stub_server.url}/flaky", params={"code": 503})
+    # The first attempt and 3 retries
+    assert len(stub_server.requests) == 4
+
+
+def test_client_errors_are_not_retried(stub_server, client):
+    with pytest.raises(requests.HTTPError):
+        client.get_json(f"{stub_server.url}/seasons/{YEAR}", params={"view": "nope"})
+    assert len(stub_server.requests) == 1
+
+
+def test_rate_limiter_allows_a_burst_then_paces():
+    limiter = RateLimiter(rate=50.0, burst=2)
+    start = time.monotonic()
+    limiter.acquire()
+    limiter.acquire()
+    assert time.monotonic() - start < 0.015
+    for _ in range(5):
+        limiter.acquire()
+    # 5 tokens beyond the burst at 50 per second
+    assert time.monotonic() - start >= 5 / 50.0 - 0.005
+
+
+def test_rate_limiter_is_shared_across_threads():
+    limiter = RateLimiter(rate=100.0, burst=1)
+    start = time.monotonic()
+    threads = [
+        threading.Thread(target=lambda: [limiter.acquire() for _ in range(5)])
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 19 / 100.0 - 0.005
+
+
+def test_fetch_many_keeps_request_order(stub_server, client, espn_request):
+    # Earlier requests answer last
+    requests_to_fetch = [
+        EspnRequest("season", {"i": i, "delay": 0.05 * (4 - i)}, extend="/slow")
+        for i in range(5)
+    ]
+    start = time.monotonic()
+    results = client.fetch_many(espn_request, requests_to_fetch)
+    assert [result["i"] for result in results] == list(range(5))
+    # Fetched concurrently, not one after another
+    assert time.monotonic() - start < 0.05 * sum(range(5))
+
+
+def test_fetch_unwraps_league_payloads(stub_server, client, espn_request):
+    payload = client.fetch(espn_request, espn_fetch.league_requests()[0])
+    assert payload["settings"]["name"] == "Fixture League"
+
+
+def test_prefetch_league_fills_the_cache(
+    stub_server, client, espn_request, monkeypatch
+):
+    cache = PayloadCache(":memory:")
+    espn_fetch.prefetch_league(client, cache, espn_request)
+
+    pool_request = espn_fetch.player_pool_request(3)
+    for request in [*espn_fetch.league_requests(), pool_request]:
+        assert cache.is_fresh(
+            espn_fetch.request_key(espn_request, request), request.params
+        )
+    assert len(stub_server.requests) == 5
+
+    # Everything is fresh, nothing is fetched again
+    espn_fetch.prefetch_league(client, cache, espn_request)
+    assert len(stub_server.requests) == 5
+
+    # And espn_api builds the League from the cache alone
+    def refuse(*args, **kwargs):
+        raise AssertionError("Unexpected network access")
+    monkeypatch.setattr(requests, "get", refuse)
+    league = espn_stats.build_league(
+        league_id=LEAGUE_ID, year=YEAR, cache=cache,
+        espn_s2=COOKIES["espn_s2"], swid=COOKIES["SWID"]
+    )
+    assert [len(team.roster) for team in league.teams] == [3, 3]
+    assert len(espn_stats.fetch_pool_players(league)) == 6
+
+
+def test_parse_pro_schedule(espn_fixtures):
+    payload = load_fixtures(espn_fixtures)["proTeamSchedules_wl"]
+    day = 1729555200000
+    two_days = 2 * 24 * 60 * 60 * 1000
+    assert espn_fetch.parse_pro_schedule(payload) == {
+        1: {1: (2, day), 2: (1, day)},
+        3: {1: (2, day + two_days), 2: (1, day + two_days)},
+    }
+    assert espn_fetch.parse_pro_schedule({}) == {}